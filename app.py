@@ -4,22 +4,33 @@ from plotly.subplots import make_subplots
 import plotly.express as px
 import pandas as pd
 import os
-import pickle
+import threading
 import dash
 from dash import dcc
 from dash import html
 from dash.exceptions import PreventUpdate
-from dash.dependencies import Input, Output, State
+from dash.dependencies import ClientsideFunction, Input, Output, State
 
 # Custom Imports
 from dataset.dataCleaning import cleanData
-from db.connection import get_weatherData, get_weatherData_bySummary, get_weatherData_byCount, get_weatherData_byYear
-from graphobjects.plots import createPlot, createTrendPlot
+from db.connection import get_weatherData_byCount, get_weatherData_snapshot, get_weatherData_byRange, get_weatherData_rollup, get_weatherData_version, get_weatherData_view, weather_snapshot
+from db.rollups import ROLLUP_COLUMNS
+from graphobjects.figurecache import FigureCache, figureKey
+from graphobjects.plots import createPlot, createTrendPlot, plotMode, pointBudget, traceValues
+from graphobjects.trendstate import TrendStates
+from live.events import SnapshotWatcher, listenForUpdates, registerEvents
+from predictor.api import FEATURE_COLUMNS, LABELS, registerModelStats, registerPredict
+from predictor.cache import PREDICTION_PREWARM, PREWARM_READINGS, PredictionCache
+from predictor.loader import ModelHandle
+from predictor.retrain import RetrainJob
 
 GRAPH_INTERVAL = os.environ.get("GRAPH_INTERVAL", 10000)
-TRAINED_MODEL = "model/weathermodel.pickle"
-with open(TRAINED_MODEL, "rb") as readFile:
-    model = pickle.load(readFile)
+TRAINED_MODEL = os.environ.get("TRAINED_MODEL", "model/weathermodel.pickle")
+FLAT_MODEL = os.environ.get("FLAT_MODEL", "model/weathermodel.flat")
+# memory-mapped on the first prediction, gunicorn workers share its pages
+model = ModelHandle(FLAT_MODEL, TRAINED_MODEL)
+# forecast answers per slider position, emptied when the model file is replaced
+prediction_cache = PredictionCache(model)
 
 pd.options.plotting.backend = 'plotly'
 
@@ -46,6 +57,90 @@ trenddict={
     'expomavg': 'Exponentially-Weighted Moving Average',
 }
 
+def plotColumns(*axes):
+    """
+    Function to list the columns a chart needs: its axes plus id for ordering
+    Input: axes (column names)
+    Output: List of column names
+    """
+    return list(dict.fromkeys(("id",) + axes))
+
+figure_cache = FigureCache()
+trend_states = TrendStates()
+
+def cachedFigure(client_key, build, *key_parts):
+    """
+    Function to serve a chart through the figure cache
+    The key combines the data version with key_parts, if the browser already shows that exact
+    figure (client_key) nothing is sent, otherwise the figure comes from the cache or build(view).
+    The snapshot is read once, build gets the same view the version was taken from.
+    Input: client_key (key stored in the chart's dcc.Store), build (function of the snapshot view returning the figure), key_parts
+    Output: Tuple (figure or dash.no_update, key or dash.no_update)
+    """
+    view = get_weatherData_view()
+    key = figureKey(get_weatherData_version(view), *key_parts)
+    if key == client_key:
+        return dash.no_update, dash.no_update
+    return figure_cache.get(key, lambda: build(view)), key
+
+def liveFigures(client_states, charts, slider_value, show_all):
+    """
+    Function to serve a group of live charts that share the data-slider/Show All window
+    Each chart is sent as no update, an append of the new rows (extendData) or a full figure. The window
+    and the new rows are sliced and cleaned once, on first use, for every chart of the group.
+    Appending is only used while the browser shows a raw scatter for the same settings and fewer new
+    rows arrived than the window holds, maxPoints then trims the trace to the data-slider window.
+    Axes, slider or Show All changes, downsampled/density/rollup figures and large gaps get a full redraw.
+    The snapshot is read once, the version, the new rows and the window all come from that one view.
+    Input: client_states (dicts stored in the charts' dcc.Store), charts (List of (name, x_axis, y_axis)),
+           slider_value, show_all
+    Output: List of (figure, extendData, state) per chart, flattened, with dash.no_update for the parts that did not change
+    """
+    view = get_weatherData_view()
+    version = get_weatherData_version(view)
+    columns = plotColumns(*[axis for _, x_axis, y_axis in charts for axis in (x_axis, y_axis)])
+    rows = version if show_all else min(int(slider_value), version)
+    frames = {}
+
+    def shared(key, load):
+        if key not in frames:
+            df = load()
+            frames[key] = cleanData(df) if df is not None else None
+        return frames[key]
+
+    def window():
+        return shared("window", lambda: get_weatherData_snapshot(None if show_all else slider_value, columns, view))
+
+    outputs = []
+    for (chart, x_axis, y_axis), client_state in zip(charts, client_states):
+        settings = figureKey(chart, slider_value, show_all)
+        key = figureKey(version, settings)
+        client_state = client_state or {}
+        if client_state.get("key") == key:
+            outputs.extend([dash.no_update, dash.no_update, dash.no_update])
+            continue
+
+        rollup = show_all and x_axis == "reading_time" and y_axis in ROLLUP_COLUMNS
+        appendable = plotMode(rows, x_axis, y_axis) == "raw" and not rollup
+        state = {"key": key, "settings": settings, "version": version, "appendable": appendable}
+
+        if appendable and client_state.get("appendable") and client_state.get("settings") == settings:
+            since = client_state["version"]
+            new = shared(("since", since), lambda: weather_snapshot.since(since, columns, view))
+            if new is not None and 0 < len(new) < rows:
+                extend = [{"x": [traceValues(new[x_axis])], "y": [traceValues(new[y_axis])]}, [0]]
+                if not show_all:
+                    extend.append(int(slider_value))
+                outputs.extend([dash.no_update, extend, state])
+                continue
+
+        if rollup:
+            build = lambda y_axis=y_axis: createPlot(cleanData(get_weatherData_rollup(max_points=pointBudget(), columns=[y_axis], view=view)), "reading_time", y_axis)
+        else:
+            build = lambda x_axis=x_axis, y_axis=y_axis: createPlot(window(), x_axis, y_axis)
+        outputs.extend([figure_cache.get(key, build), dash.no_update, state])
+    return outputs
+
 """
 Define general properties for the DASH app
 """
@@ -57,11 +152,45 @@ app.title = "Weather Dashboard"
 app_color = {"graph_bg": "#252729", "graph_line": "#008019", "trace": "#379C4B", "trend": "#EB4034"}
 server = app.server
 
+"""
+Push channel: a Server-Sent Events stream of the data version replaces per-client polling while connected,
+the data-slider and Show All are Inputs of the chart callbacks so they redraw without a polling tick
+"""
+registerEvents(server, SnapshotWatcher())
+listenForUpdates()
+
+"""
+Batch scoring: POST readings as JSON or CSV to /api/predict, GET /api/model for this worker's model, memory and prediction cache
+"""
+registerPredict(server, model.latest)
+registerModelStats(server, model, prediction_cache)
+
+def prewarmPredictions():
+    """
+    Function to fill the prediction cache with the slider positions closest to the latest readings
+    Input: None
+    Output: None
+    """
+    prediction_cache.prewarm(get_weatherData_byCount(PREWARM_READINGS, FEATURE_COLUMNS), PREDICTION_PREWARM)
+
+if PREDICTION_PREWARM:
+    threading.Thread(target=prewarmPredictions, name="prediction-prewarm", daemon=True).start()
+
+"""
+Retraining: with RETRAIN_INTERVAL set, trees fitted on new readings are added to the flattened model,
+one process at a time, and every worker picks the new model up on its next prediction
+"""
+retrain_job = RetrainJob(FLAT_MODEL)
+retrain_job.start()
+
 """
 HTML layout for the DASH app
 """
 app.layout = html.Div(
     [
+        # push-based refresh, see assets/live.js
+        dcc.Store(id="data-version"),
+        dcc.Store(id="live-status"),
         # header
         html.Div(
             [
@@ -134,6 +263,7 @@ app.layout = html.Div(
                                 )
                             ),
                         ),
+                        dcc.Store(id="temperature-version"),
                         dcc.Interval(
                             id="temperature-update",
                             interval=int(GRAPH_INTERVAL),
@@ -162,11 +292,7 @@ app.layout = html.Div(
                                 )
                             ),
                         ),
-                        dcc.Interval(
-                            id="apptempVsHumidity-update",
-                            interval=int(GRAPH_INTERVAL),
-                            n_intervals=0,
-                        ),
+                        dcc.Store(id="apptempVsHumidity-version"),
                     ],
                     className="one-half column apptempVsHumidity__container",
                 ),
@@ -185,11 +311,7 @@ app.layout = html.Div(
                                 )
                             ),
                         ),
-                        dcc.Interval(
-                            id="tempVsHumidity-update",
-                            interval=int(GRAPH_INTERVAL),
-                            n_intervals=0,
-                        ),
+                        dcc.Store(id="tempVsHumidity-version"),
                     ],
                     className="one-half column tempVsHumidity__container",
                 ),
@@ -251,6 +373,7 @@ app.layout = html.Div(
                                 )
                             ),
                         ),
+                        dcc.Store(id="userdefplot-version"),
                         dcc.Interval(
                             id="userdefplot-update",
                             interval=int(GRAPH_INTERVAL),
@@ -335,6 +458,7 @@ app.layout = html.Div(
                                 )
                             ),
                         ),
+                        dcc.Store(id="yeardataplot-version"),
                         dcc.Interval(
                             id="yeardataplot-update",
                             interval=int(GRAPH_INTERVAL),
@@ -414,6 +538,7 @@ app.layout = html.Div(
                                 )
                             ),
                         ),
+                        dcc.Store(id="trenddataplot-version"),
                         dcc.Interval(
                             id="trenddataplot-update",
                             interval=int(GRAPH_INTERVAL),
@@ -586,6 +711,12 @@ app.layout = html.Div(
     className="app__container",
 )
 
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="connect"),
+    Output("live-status", "data"),
+    [Input("live-status", "id")],
+)
+
 @app.callback(
     Output("predicttext", "children"),
     [Input("submit", "n_clicks")],
@@ -608,16 +739,12 @@ def prediction(n_clicks, temp, app_temp, humidity, windspeed, windbearing, visib
     if(n_clicks == 0):
         return "Click the button to run forecasting model"
     else:
+        #Feature order of the trained model: Temperature (C), Apparent Temperature (C), Humidity, Wind Speed (km/h), Wind Bearing (degrees), Visibility (km), Pressure (millibars)
         inputdata = [temp, app_temp, humidity, windspeed, windbearing, visibility, pressure]
-        columnname = ['Temperature (C)', 'Apparent Temperature (C)', 'Humidity', 'Wind Speed (km/h)', 'Wind Bearing (degrees)', 'Visibility (km)', 'Pressure (millibars)']
-
-        sampleinput = pd.DataFrame(data=[inputdata])
-        sampleinput.columns = columnname
-        prediction = model.predict(sampleinput)
+        prediction = prediction_cache.predict(inputdata)
 
         #Class Label corresponding to trained model 0,1,2
-        labels = ["No Precipitation", "Rainfall", "Snowfall"]
-        return "Based on input data, the prediction is: {}".format(labels[prediction[0]])
+        return "Based on input data, the prediction is: {}".format(LABELS[prediction])
 
 @app.callback(
     Output("trenddatatext", "children"), 
@@ -634,30 +761,34 @@ def update_trenddatatext(value, x_axis, y_axis):
     return "{} Trend for {} vs {}".format(trenddict["{}".format(value)],labeldict["{}".format(y_axis)],labeldict["{}".format(x_axis)])
 
 @app.callback(
-    Output("trenddataplot", "figure"), 
+    [Output("trenddataplot", "figure"), Output("trenddataplot-version", "data")],
     [Input("trenddataplot-update", "n_intervals")],
+    [Input("data-version", "data")],
     [Input("trend-dropdown", "value")], 
     [Input("x-axis-dropdown3", "value")], 
     [Input("y-axis-dropdown3", "value")],
-    [
-        State("data-slider", "value"),
-        State("show-all", "value"),
-    ],
+    [Input("data-slider", "value")],
+    [Input("show-all", "value")],
+    [State("trenddataplot-version", "data")],
 )
-def gen_trenddataplot(interval, trend, x_axis, y_axis, slider_value, auto_state):
+def gen_trenddataplot(interval, version, trend, x_axis, y_axis, slider_value, auto_state, client_key):
     """
     Function to generate Trend Data plots
-    Input: interval, trend, x_axis, y_axis, slider_value, auto_state
-    Output: Plotly.Express Figure
+    Input: interval, version, trend, x_axis, y_axis, slider_value, auto_state, client_key
+    Output: Plotly.Express Figure, figure cache key
     """
-    if "Show All" in auto_state:
-        df = get_weatherData()
-    else:
-        df = get_weatherData_byCount(slider_value)
+    def build(view):
+        if "Show All" in auto_state:
+            df = get_weatherData_snapshot(columns=plotColumns(x_axis, y_axis), view=view)
+        else:
+            df = get_weatherData_snapshot(slider_value, plotColumns(x_axis, y_axis), view)
 
-    df = cleanData(df)
+        df = cleanData(df)
+        line = trend_states.get(trend, x_axis, y_axis, "all" if "Show All" in auto_state else slider_value).update(df)
 
-    return createTrendPlot(df,x_axis,y_axis,trend)
+        return createTrendPlot(df,x_axis,y_axis,trend,line=line)
+
+    return cachedFigure(client_key, build, "trenddataplot", trend, x_axis, y_axis, slider_value, "Show All" in auto_state)
 
 
 @app.callback(
@@ -673,22 +804,31 @@ def update_yeardatatext(value):
     return "Data for year {}".format(value)
 
 @app.callback(
-    Output("yeardataplot", "figure"), 
+    [Output("yeardataplot", "figure"), Output("yeardataplot-version", "data")],
     [Input("yeardataplot-update", "n_intervals")], 
+    [Input("data-version", "data")],
     [Input("year-dropdown", "value")], 
     [Input("x-axis-dropdown2", "value")], 
     [Input("y-axis-dropdown2", "value")],
+    [State("yeardataplot-version", "data")],
 )
-def gen_yeardataplot(interval, value, x_axis, y_axis):
+def gen_yeardataplot(interval, version, value, x_axis, y_axis, client_key):
     """
     Function to generate Yearly Data plots
-    Input: interval, value, x_axis, y_axis
-    Output: Plotly.Express Figure
+    Input: interval, version, value, x_axis, y_axis, client_key
+    Output: Plotly.Express Figure, figure cache key
     """
-    df = get_weatherData_byYear(value)
-    df = cleanData(df)
+    def build(view):
+        start, end = "{}-01-01".format(value), "{}-01-01".format(int(value) + 1)
+        if x_axis == "reading_time" and y_axis in ROLLUP_COLUMNS:
+            df = get_weatherData_rollup(start, end, pointBudget(), [y_axis], view)
+        else:
+            df = get_weatherData_byRange(start, end, plotColumns(x_axis, y_axis))
+        df = cleanData(df)
+
+        return createPlot(df,x_axis,y_axis)
 
-    return createPlot(df,x_axis,y_axis)
+    return cachedFigure(client_key, build, "yeardataplot", value, x_axis, y_axis)
 
 @app.callback(
     Output("userdeftext", "children"), 
@@ -704,98 +844,64 @@ def update_userdeftext(x_axis, y_axis):
     return "{} VS {}".format(labeldict["{}".format(y_axis)],labeldict["{}".format(x_axis)])
 
 @app.callback(
-    Output("userdefplot", "figure"), 
+    [Output("userdefplot", "figure"), Output("userdefplot-version", "data")],
     [Input("userdefplot-update", "n_intervals")], 
+    [Input("data-version", "data")],
     [Input("x-axis-dropdown", "value")], 
     [Input("y-axis-dropdown", "value")],
-    [
-        State("data-slider", "value"),
-        State("show-all", "value"),
-    ],
+    [Input("data-slider", "value")],
+    [Input("show-all", "value")],
+    [State("userdefplot-version", "data")],
 )
-def gen_userdefplot(interval, x_axis, y_axis, slider_value, auto_state):
+def gen_userdefplot(interval, version, x_axis, y_axis, slider_value, auto_state, client_key):
     """
     Function to generate User Defined Data plots
-    Input: interval, x_axis, y_axis, slider_value, auto_state
-    Output: Plotly.Express Figure
+    Input: interval, version, x_axis, y_axis, slider_value, auto_state, client_key
+    Output: Plotly.Express Figure, figure cache key
     """
-    if "Show All" in auto_state:
-        df = get_weatherData()
-    else:
-        df = get_weatherData_byCount(slider_value)
-    
-    df = cleanData(df)
+    def build(view):
+        if "Show All" in auto_state and x_axis == "reading_time" and y_axis in ROLLUP_COLUMNS:
+            df = get_weatherData_rollup(max_points=pointBudget(), columns=[y_axis], view=view)
+        elif "Show All" in auto_state:
+            df = get_weatherData_snapshot(columns=plotColumns(x_axis, y_axis), view=view)
+        else:
+            df = get_weatherData_snapshot(slider_value, plotColumns(x_axis, y_axis), view)
 
-    return createPlot(df,x_axis,y_axis)
+        df = cleanData(df)
 
-@app.callback(
-    Output("temperature", "figure"), 
-    [Input("temperature-update", "n_intervals")],
-    [
-        State("data-slider", "value"),
-        State("show-all", "value"),
-    ]
-)
-def gen_temperature(interval, slider_value, auto_state):
-    """
-    Function to generate Temperature vs Reading Time Data plots
-    Input: interval, slider_value, auto_state
-    Output: Plotly.Express Figure
-    """
-    if "Show All" in auto_state:
-        df = get_weatherData()
-    else:
-        df = get_weatherData_byCount(slider_value)
-    
-    df = cleanData(df)
+        return createPlot(df,x_axis,y_axis)
 
-    return createPlot(df,"reading_time","temperature")
+    return cachedFigure(client_key, build, "userdefplot", x_axis, y_axis, slider_value, "Show All" in auto_state)
 
 @app.callback(
-    Output("apptempVsHumidity", "figure"), 
-    [Input("apptempVsHumidity-update", "n_intervals")],
     [
-        State("data-slider", "value"),
-        State("show-all", "value"),
-    ]
-)
-def gen_apptempVsHumidity(interval, slider_value, auto_state):
-    """
-    Function to generate Apparent Temperature vs Humidity Data plots
-    Input: interval, slider_value, auto_state
-    Output: Plotly.Express Figure
-    """
-    if "Show All" in auto_state:
-        df = get_weatherData()
-    else:
-        df = get_weatherData_byCount(slider_value)
-
-    df = cleanData(df)
-
-    return createPlot(df,"humidity","apparent_temperature")
-
-@app.callback(
-    Output("tempVsHumidity", "figure"), 
-    [Input("tempVsHumidity-update", "n_intervals")],
+        Output("temperature", "figure"), Output("temperature", "extendData"), Output("temperature-version", "data"),
+        Output("apptempVsHumidity", "figure"), Output("apptempVsHumidity", "extendData"), Output("apptempVsHumidity-version", "data"),
+        Output("tempVsHumidity", "figure"), Output("tempVsHumidity", "extendData"), Output("tempVsHumidity-version", "data"),
+    ],
+    [Input("temperature-update", "n_intervals")],
+    [Input("data-version", "data")],
+    [Input("data-slider", "value")],
+    [Input("show-all", "value")],
     [
-        State("data-slider", "value"),
-        State("show-all", "value"),
+        State("temperature-version", "data"),
+        State("apptempVsHumidity-version", "data"),
+        State("tempVsHumidity-version", "data"),
     ]
 )
-def gen_tempVsHumidity(interval, slider_value, auto_state):
+def gen_liveplots(interval, version, slider_value, auto_state, temperature_state, apptemp_state, tempvshumidity_state):
     """
-    Function to generate Temperature vs Humidity Data plots
-    Input: interval, slider_value, auto_state
-    Output: Plotly.Express Figure
+    Function to generate the Temperature vs Reading Time, Apparent Temperature vs Humidity and Temperature vs Humidity
+    Data plots from one data window, they share the data-slider and Show All settings
+    Input: interval, version, slider_value, auto_state, temperature_state, apptemp_state, tempvshumidity_state
+    Output: Plotly Figure, extendData, chart state for each of the three charts
     """
-    if "Show All" in auto_state:
-        df = get_weatherData()
-    else:
-        df = get_weatherData_byCount(slider_value)
-
-    df = cleanData(df)
-
-    return createPlot(df,"humidity","temperature")
+    charts = [
+        ("temperature", "reading_time", "temperature"),
+        ("apptempVsHumidity", "humidity", "apparent_temperature"),
+        ("tempVsHumidity", "humidity", "temperature"),
+    ]
+    return liveFigures([temperature_state, apptemp_state, tempvshumidity_state], charts, slider_value, "Show All" in auto_state)
 
 if __name__ == "__main__":
     app.run_server(debug=False)
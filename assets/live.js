@@ -0,0 +1,37 @@
+// Push-based refresh: listens to the server's data version events (live/events.py) and feeds them to
+// the "data-version" store that triggers the chart callbacks. While the stream is connected the
+// polling intervals are disabled, if it drops they take over again until the browser reconnects.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    live: {
+        connect: function (id) {
+            var intervals = [
+                "temperature-update",
+                "userdefplot-update",
+                "yeardataplot-update",
+                "trenddataplot-update",
+            ];
+            var setProps = window.dash_clientside.set_props;
+            if (!window.EventSource || !setProps || window.weatheralyticsEvents) {
+                return window.dash_clientside.no_update;
+            }
+
+            var setPolling = function (enabled) {
+                intervals.forEach(function (interval) {
+                    setProps(interval, {disabled: !enabled});
+                });
+            };
+            var source = new EventSource("/events/data");
+            source.onopen = function () {
+                setPolling(false);
+            };
+            source.onmessage = function (event) {
+                setProps("data-version", {data: Number(event.data)});
+            };
+            source.onerror = function () {
+                setPolling(true);
+            };
+            window.weatheralyticsEvents = source;
+            return "connected";
+        },
+    },
+});
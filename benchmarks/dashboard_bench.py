@@ -0,0 +1,283 @@
+"""
+Dashboard benchmark suite, runs fully offline. For every --rows scale it builds a synthetic weatherHistory
+table in SQLite (dataset/syntheticData.py, db/sqlite.py) and a small model trained on it, both cached in
+--data-dir, then imports app against them in a fresh process and times:
+- the first load of the shared snapshot
+- every app.py callback: the live charts, the trend chart for every trend, the user defined and yearly
+  charts at each --windows data-slider setting ("all" is Show All), the text callbacks and prediction.
+  Each is called cold (figure cache, trendline states and prediction cache emptied first) and warm
+  (called again unchanged), and the output is encoded to JSON the way Dash sends it
+- cleanData, createPlot and createTrendPlot on the same windows
+Every case reports the median and minimum of --repeat runs. Results are written as JSON (--output),
+--compare previous.json lists the cases whose cold median is more than --threshold times the previous
+one and exits with status 1 when there are any.
+
+Usage: python -m benchmarks.dashboard_bench --rows 100000,1000000 --output bench.json [--compare previous.json]
+"""
+# Standard Imports
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WINDOWS = "100,5000,50000,all"
+PAIRS = [("reading_time", "temperature"), ("humidity", "temperature")]
+YEARS = ["2006", "2016"]
+# default slider positions of the forecast panel, a cold, humid reading and a warm, dry one
+PREDICTION_INPUTS = [(0, 0, 0.5, 5, 180, 5, 1000), (-5, -10, 0.95, 12, 30, 2, 1005), (25, 27, 0.3, 3, 270, 16, 1020)]
+MODEL_TRAIN_ROWS = 200000
+
+def _buildTable(path, rows, seed):
+    """
+    Write the synthetic table next to path and move it into place, an interrupted build is never reused
+    """
+    from db.connection import INSERT_QUERY
+    from db.sqlite import connectSqlite
+    from dataset.syntheticData import fillDatabase
+
+    staging = "{}.tmp-{}".format(path, os.getpid())
+    cnx = connectSqlite(staging)
+
+    def addBatch(batch):
+        cursor = cnx.cursor()
+        cursor.executemany(INSERT_QUERY, batch)
+        cnx.commit()
+        return len(batch)
+
+    fillDatabase(addBatch, rows, seed)
+    cnx.close()
+    os.replace(staging, path)
+
+def _buildModel(path, seed):
+    """
+    Train a small forest on the synthetic table so prediction has a model to serve
+    """
+    import numpy as np
+    from predictor.flatforest import flattenForest, saveForest
+    from predictor.training import loadTrainingData, trainForest
+
+    X_train, y_train, _, _, info = loadTrainingData(MODEL_TRAIN_ROWS, seed=seed)
+    arrays = flattenForest(trainForest(X_train, y_train, n_estimators=30, max_depth=12, seed=seed))
+    arrays['trained_id'] = np.array(info['max_id'], dtype=np.int64)
+    saveForest(arrays, path)
+
+def _median(values):
+    return statistics.median(values) if values else None
+
+def prepare(rows, data_dir, seed):
+    """
+    API to build the synthetic table and model of a scale once and point db.connection and app at them,
+    call it before either is imported
+    Input: rows (Int), data_dir (String), seed (Int)
+    Output: Dict (database, model paths and the seconds spent building each)
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    base = os.path.join(data_dir, "weather-{}-{}".format(rows, seed))
+    os.environ["WEATHER_SQLITE"] = base + ".sqlite"
+    os.environ["FLAT_MODEL"] = base + ".flat"
+    os.environ["TRAINED_MODEL"] = ""
+    for name in ("UPDATES_BROKER", "RETRAIN_INTERVAL", "PREDICTION_PREWARM"):
+        os.environ.pop(name, None)
+
+    setup = {'database': base + ".sqlite", 'model': base + ".flat"}
+    start = time.perf_counter()
+    if not os.path.exists(setup['database']):
+        _buildTable(setup['database'], rows, seed)
+    setup['table_seconds'] = time.perf_counter() - start
+    start = time.perf_counter()
+    if not os.path.exists(setup['model']):
+        _buildModel(setup['model'], seed)
+    setup['model_seconds'] = time.perf_counter() - start
+    return setup
+
+def child(rows, data_dir, windows, repeat, seed):
+    """
+    API run in a fresh process per scale: prepare the data and model, import app and time every case
+    Input: rows (Int), data_dir (String), windows (List of Ints or "all"), repeat (Int), seed (Int)
+    Output: Dict (rows, setup timings and the List of case results)
+    """
+    setup = prepare(rows, data_dir, seed)
+
+    import dash
+    import pandas as pd
+    from plotly.io.json import to_json_plotly
+    from db.connection import get_weatherData_snapshot, weather_snapshot
+    from dataset.dataCleaning import cleanData
+    from graphobjects.figurecache import FigureCache
+    from graphobjects.plots import createPlot, createTrendPlot, trenddict
+    from graphobjects.trendstate import TrendStates
+    from predictor.cache import PredictionCache
+
+    start = time.perf_counter()
+    import app
+    setup['import_seconds'] = time.perf_counter() - start
+    start = time.perf_counter()
+    version = weather_snapshot.refresh(force=True)
+    setup['snapshot_load_seconds'] = time.perf_counter() - start
+
+    def reset():
+        app.figure_cache = FigureCache()
+        app.trend_states = TrendStates()
+        app.prediction_cache = PredictionCache(app.model)
+
+    def encode(output):
+        outputs = output if isinstance(output, (list, tuple)) else [output]
+        return to_json_plotly([None if isinstance(value, type(dash.no_update)) else value for value in outputs])
+
+    results = []
+
+    def case(name, params, call, cold_reset=reset, prepare=None):
+        cold, warm = [], []
+        for _ in range(repeat):
+            if cold_reset is not None:
+                cold_reset()
+            argument = prepare() if prepare is not None else None
+            start = time.perf_counter()
+            output = call(argument) if prepare is not None else call()
+            cold.append(time.perf_counter() - start)
+        if prepare is None:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                call()
+                warm.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        # cleanData returns a frame, nothing a browser receives
+        encoded = "" if output is None or isinstance(output, pd.DataFrame) else encode(output)
+        results.append({
+            'name': name,
+            'params': params,
+            'rows': rows,
+            'cold_median_seconds': _median(cold),
+            'cold_min_seconds': min(cold),
+            'warm_median_seconds': _median(warm),
+            'json_seconds': time.perf_counter() - start,
+            'json_bytes': len(encoded),
+        })
+
+    def settings(window):
+        return (50000, ["Show All"]) if window == "all" else (window, [])
+
+    # pages a browser opens at once: the three live charts, then the charts below them
+    for window in windows:
+        slider_value, auto_state = settings(window)
+        params = {'window': window}
+        case("gen_liveplots", params, lambda: app.gen_liveplots(0, version, slider_value, auto_state, None, None, None))
+        for trend in trenddict:
+            case("gen_trenddataplot", dict(params, trend=trend), lambda: app.gen_trenddataplot(0, version, trend, "reading_time", "temperature", slider_value, auto_state, None))
+        for x_axis, y_axis in PAIRS:
+            case("gen_userdefplot", dict(params, x_axis=x_axis, y_axis=y_axis), lambda: app.gen_userdefplot(0, version, x_axis, y_axis, slider_value, auto_state, None))
+    for year in YEARS:
+        for x_axis, y_axis in PAIRS:
+            case("gen_yeardataplot", {'year': year, 'x_axis': x_axis, 'y_axis': y_axis}, lambda: app.gen_yeardataplot(0, version, year, x_axis, y_axis, None))
+    case("update_trenddatatext", {}, lambda: app.update_trenddatatext("ols", "reading_time", "temperature"))
+    case("update_yeardatatext", {}, lambda: app.update_yeardatatext("2006"))
+    case("update_userdeftext", {}, lambda: app.update_userdeftext("humidity", "temperature"))
+    for inputs in PREDICTION_INPUTS:
+        case("prediction", {'inputs': list(inputs)}, lambda: app.prediction(1, *inputs))
+
+    # the building blocks the callbacks share, on private copies of the same windows
+    for window in windows:
+        n = None if window == "all" else window
+        frame = lambda: get_weatherData_snapshot(n)
+        params = {'window': window}
+        case("cleanData", params, lambda df: cleanData(df), None, frame)
+        case("cleanData_text_times", params, lambda df: cleanData(df), None,
+             lambda: frame().assign(reading_time=lambda df: df['reading_time'].dt.strftime("%Y-%m-%d %H:%M:%S")))
+        for x_axis, y_axis in PAIRS:
+            case("createPlot", dict(params, x_axis=x_axis, y_axis=y_axis), lambda df: createPlot(df, x_axis, y_axis), None, frame)
+        for trend in trenddict:
+            case("createTrendPlot", dict(params, trend=trend), lambda df: createTrendPlot(df, "reading_time", "temperature", trend), None, frame)
+
+    return {'rows': rows, 'setup': setup, 'results': results}
+
+def _caseKey(result):
+    return json.dumps([result['name'], result['params'], result['rows']], sort_keys=True)
+
+def compare(previous, current, threshold):
+    """
+    API to list the cases that got slower than threshold times their previous cold median
+    Input: previous, current (Dicts written by run), threshold (Float)
+    Output: List of Dicts (case, previous and current median, ratio)
+    """
+    before = {_caseKey(result): result for scale in previous['scales'] for result in scale['results']}
+    slower = []
+    for scale in current['scales']:
+        for result in scale['results']:
+            old = before.get(_caseKey(result))
+            if old is None or not old['cold_median_seconds']:
+                continue
+            ratio = result['cold_median_seconds'] / old['cold_median_seconds']
+            if ratio > threshold:
+                slower.append({'name': result['name'], 'params': result['params'], 'rows': result['rows'],
+                               'previous_seconds': old['cold_median_seconds'], 'seconds': result['cold_median_seconds'], 'ratio': ratio})
+    return slower
+
+def _gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(rows_list, data_dir, windows, repeat, seed):
+    """
+    API to benchmark every scale in its own process
+    Input: rows_list (List of Ints), data_dir, windows (String, comma separated), repeat, seed
+    Output: Dict (meta, scales)
+    """
+    scales = []
+    for rows in rows_list:
+        command = [sys.executable, "-m", "benchmarks.dashboard_bench", "--child", str(rows), "--data-dir", data_dir,
+                   "--windows", windows, "--repeat", str(repeat), "--seed", str(seed)]
+        output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+        scales.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'meta': {
+            'commit': _gitCommit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'started': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'windows': windows,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'scales': scales,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100000", help="comma separated table sizes, e.g. 100000,1000000,10000000")
+    parser.add_argument("--windows", default=WINDOWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "weatheralytics-bench"))
+    parser.add_argument("--output", default=None, help="write the results here instead of stdout")
+    parser.add_argument("--compare", default=None, help="results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    windows = [window if window == "all" else int(window) for window in args.windows.split(",")]
+    if args.child is not None:
+        print(json.dumps(child(args.child, args.data_dir, windows, args.repeat, args.seed)))
+        sys.exit(0)
+
+    results = run([int(rows) for rows in args.rows.split(",")], args.data_dir, args.windows, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as writeFile:
+            json.dump(results, writeFile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as readFile:
+            slower = compare(json.load(readFile), results, args.threshold)
+        for result in slower:
+            print("slower: {name} {params} at {rows} rows, {previous_seconds:.4f}s -> {seconds:.4f}s ({ratio:.2f}x)".format(**result), file=sys.stderr)
+        sys.exit(1 if slower else 0)
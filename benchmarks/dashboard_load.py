@@ -0,0 +1,375 @@
+"""
+Concurrent viewer load test for the Dash server, runs fully offline. Starts app.server the way it is
+deployed, gunicorn with gunicorn.conf.py (gthread workers, --workers processes, WEB_CONCURRENCY by
+default), on a synthetic SQLite table (see dashboard_bench.prepare), reads the callbacks from
+/_dash-dependencies and the layout from /_dash-layout, and replays the _dash-update-component
+requests of every callback driven by a dcc.Interval for each simulated client: one poller per client
+and interval, ticking every interval (GRAPH_INTERVAL, --interval to override) from a random offset,
+sending the layout's dropdown and slider values and feeding the stores it gets back into the next
+request the way the browser does. This is the polling fallback, the worst case; with the events
+stream connected the same callbacks run once per new data version instead.
+New readings are appended every --ingest-every seconds so the charts keep changing, the table is
+copied first and the cached one is left as it was.
+For every client count it reports p50/p95/p99 callback latency overall and per callback, requests/sec,
+the share of ticks that took longer than the interval (the refresh falling behind), and per worker and
+in total database queries/sec (connection checkouts of db_pool) and CPU, which every worker writes to
+a stats directory. --server werkzeug runs the single-process threaded development server instead.
+
+Usage: python -m benchmarks.dashboard_load --rows 100000 --clients 1,10,50 --duration 30 [--workers 2]
+"""
+# Standard Imports
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+# Custom Imports
+from benchmarks.dashboard_bench import prepare
+
+STATS_PATH = "/_loadtest/stats"
+STATS_INTERVAL = 0.2
+
+def _workerStats():
+    from db.connection import db_pool
+    return {'pid': os.getpid(), 'pool': db_pool.stats(), 'cpu': time.process_time(), 'threads': threading.active_count()}
+
+def createServer(stats_dir):
+    """
+    API to load the dashboard in a gunicorn worker, which then writes its pool and CPU counters to
+    stats_dir/<pid>.json every STATS_INTERVAL seconds
+    Input: stats_dir (String)
+    Output: Flask app, gunicorn loads it with benchmarks.dashboard_load:createServer(...)
+    """
+    from flask import jsonify
+    import app
+
+    def publish():
+        path = os.path.join(stats_dir, "{}.json".format(os.getpid()))
+        while True:
+            with open(path + ".tmp", "w") as writeFile:
+                json.dump(_workerStats(), writeFile)
+            os.replace(path + ".tmp", path)
+            time.sleep(STATS_INTERVAL)
+
+    threading.Thread(target=publish, name="loadtest-stats", daemon=True).start()
+    app.server.add_url_rule(STATS_PATH, "loadtest_stats", lambda: jsonify(_workerStats()))
+    return app.server
+
+def serve(port):
+    """
+    API to run the dashboard on the threaded werkzeug server in this process until it is killed
+    Input: port (Int)
+    Output: None
+    """
+    from flask import jsonify
+    from werkzeug.serving import make_server
+    import app
+
+    app.server.add_url_rule(STATS_PATH, "loadtest_stats", lambda: jsonify(_workerStats()))
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    make_server("127.0.0.1", port, app.server, threaded=True).serve_forever()
+
+def _readStats(port, stats_dir):
+    """
+    Counters of every worker, keyed by pid: the files gunicorn workers write, or the werkzeug server's route
+    """
+    if stats_dir is None:
+        stats = _get(port, STATS_PATH)
+        return {stats['pid']: stats}
+    time.sleep(2 * STATS_INTERVAL)
+    workers = {}
+    for filename in os.listdir(stats_dir):
+        if filename.endswith(".json"):
+            with open(os.path.join(stats_dir, filename)) as readFile:
+                stats = json.load(readFile)
+            workers[stats['pid']] = stats
+    return workers
+
+def _request(port, method, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+def _get(port, path):
+    return json.loads(_request(port, "GET", path)[1])
+
+def _walk(component, values, intervals):
+    """
+    Collect the initial property values of every component with an id, and the dcc.Interval periods
+    """
+    if isinstance(component, list):
+        for child in component:
+            _walk(child, values, intervals)
+        return
+    if not isinstance(component, dict) or 'props' not in component:
+        return
+    props = component['props']
+    if 'id' in props:
+        for name, value in props.items():
+            if name != 'children':
+                values[(props['id'], name)] = value
+        if component.get('type') == "Interval":
+            intervals[props['id']] = props.get('interval', 1000) / 1000.0
+    _walk(props.get('children'), values, intervals)
+
+def _outputs(output):
+    """
+    Split a dependency's output string, "..a.figure...b.data.." for several outputs, into id/property pairs
+    """
+    multi = output.startswith("..")
+    specs = [{'id': part.rsplit(".", 1)[0], 'property': part.rsplit(".", 1)[1]} for part in output.strip(".").split("...")]
+    return specs if multi else specs[0]
+
+def discover(port, interval=None):
+    """
+    API to find the callbacks a dcc.Interval drives and the layout values their requests start from
+    Input: port (Int), interval (Float: seconds, None for the layout's periods)
+    Output: Tuple (List of Dicts: name, output, outputs, inputs, state, trigger, interval; Dict of initial values)
+    """
+    values, intervals = {}, {}
+    _walk(_get(port, "/_dash-layout"), values, intervals)
+    callbacks = []
+    for dependency in _get(port, "/_dash-dependencies"):
+        if dependency.get('clientside_function'):
+            continue
+        triggers = [item['id'] for item in dependency['inputs'] if item['id'] in intervals and item['property'] == "n_intervals"]
+        if not triggers:
+            continue
+        outputs = _outputs(dependency['output'])
+        callbacks.append({
+            'name': (outputs[0] if isinstance(outputs, list) else outputs)['id'],
+            'output': dependency['output'],
+            'outputs': outputs,
+            'inputs': dependency['inputs'],
+            'state': dependency['state'],
+            'trigger': triggers[0],
+            'interval': interval or intervals[triggers[0]],
+        })
+    return callbacks, values
+
+class Recorder:
+    """
+    Collects (finished at, callback, seconds, status, late) for every request from all pollers.
+    """
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, status, late):
+        with self._lock:
+            self.samples.append((time.monotonic(), name, seconds, status, late))
+
+    def window(self, start, end):
+        with self._lock:
+            return [sample for sample in self.samples if start <= sample[0] < end]
+
+class Client:
+    """
+    One simulated dashboard: the component values it would send, shared by its pollers.
+    """
+
+    def __init__(self, values, tracked):
+        self.values = {key: value for key, value in values.items() if key in tracked}
+        self._lock = threading.Lock()
+
+    def payload(self, callback):
+        with self._lock:
+            self.values[(callback['trigger'], "n_intervals")] = (self.values.get((callback['trigger'], "n_intervals")) or 0) + 1
+            fill = lambda items: [dict(item, value=self.values.get((item['id'], item['property']))) for item in items]
+            return json.dumps({
+                'output': callback['output'],
+                'outputs': callback['outputs'],
+                'inputs': fill(callback['inputs']),
+                'state': fill(callback['state']),
+                'changedPropIds': ["{}.n_intervals".format(callback['trigger'])],
+            })
+
+    def apply(self, body):
+        with self._lock:
+            for component, props in json.loads(body).get('response', {}).items():
+                for name, value in props.items():
+                    if (component, name) in self.values:
+                        self.values[(component, name)] = value
+
+class Poller(threading.Thread):
+    """
+    Fires one Interval-driven callback of a client every interval seconds. A request that outlasts the
+    interval is late, the next tick goes out as soon as it returns.
+    """
+
+    def __init__(self, port, client, callback, recorder, stop):
+        super().__init__(daemon=True)
+        self.port = port
+        self.client = client
+        self.callback = callback
+        self.recorder = recorder
+        self.stop = stop
+
+    def run(self):
+        interval = self.callback['interval']
+        next_tick = time.monotonic() + random.uniform(0, interval)
+        while not self.stop.wait(max(0.0, next_tick - time.monotonic())):
+            start = time.monotonic()
+            try:
+                status, body = _request(self.port, "POST", "/_dash-update-component", self.client.payload(self.callback))
+            except (OSError, http.client.HTTPException):
+                status, body = 0, b""
+            seconds = time.monotonic() - start
+            if status == 200:
+                self.client.apply(body)
+            self.recorder.add(self.callback['name'], seconds, status, seconds > interval)
+            next_tick = max(next_tick + interval, time.monotonic())
+
+def _percentiles(seconds):
+    if not seconds:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    return {'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2)}
+
+def _ingest(database, rows, seed, every, batch, stop):
+    """
+    Append batch synthetic readings after the last one every every seconds, as the sensors would
+    """
+    from db.connection import INSERT_QUERY
+    from db.sqlite import connectSqlite
+    from dataset.syntheticData import syntheticReadings, syntheticRows
+
+    cnx = connectSqlite(database)
+    position = rows
+    while not stop.wait(every):
+        cursor = cnx.cursor()
+        cursor.executemany(INSERT_QUERY, syntheticRows(syntheticReadings(batch, seed, position, rows)))
+        cnx.commit()
+        position += batch
+    cnx.close()
+
+def run(steps, duration, rows, data_dir, seed, interval, ingest_every, ingest_rows, port, server="gunicorn", workers=1):
+    """
+    API to start the server and measure it at every client count
+    Input: steps (List of client counts), duration (seconds measured per step), rows, data_dir, seed,
+           interval (seconds, None for GRAPH_INTERVAL), ingest_every (seconds, 0 for no new readings), ingest_rows, port,
+           server ("gunicorn" or "werkzeug"), workers (gunicorn worker processes)
+    Output: Dict (rows, server, workers, callbacks, List of Dicts, one per step)
+    """
+    setup = prepare(rows, data_dir, seed)
+    workdir = tempfile.mkdtemp(prefix="weatheralytics-load-")
+    database = os.path.join(workdir, "weather.sqlite")
+    shutil.copyfile(setup['database'], database)
+    env = dict(os.environ, WEATHER_SQLITE=database)
+    if server == "gunicorn":
+        stats_dir = os.path.join(workdir, "stats")
+        os.makedirs(stats_dir)
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers), "--bind", "127.0.0.1:{}".format(port),
+                   "benchmarks.dashboard_load:createServer({!r})".format(stats_dir)]
+    else:
+        stats_dir = None
+        command = [sys.executable, "-m", "benchmarks.dashboard_load", "--serve", "--port", str(port)]
+    process = subprocess.Popen(command, env=env)
+    stop = threading.Event()
+    try:
+        for _ in range(600):
+            try:
+                _get(port, STATS_PATH)
+                break
+            except (OSError, ValueError):
+                time.sleep(0.1)
+        callbacks, values = discover(port, interval)
+        tracked = {(item['id'], item['property']) for callback in callbacks for item in callback['inputs'] + callback['state']}
+        if ingest_every:
+            threading.Thread(target=_ingest, args=(database, rows, seed + 1, ingest_every, ingest_rows, stop), daemon=True).start()
+
+        recorder = Recorder()
+        clients = 0
+        results = []
+        for count in steps:
+            for _ in range(count - clients):
+                client = Client(values, tracked)
+                for callback in callbacks:
+                    Poller(port, client, callback, recorder, stop).start()
+            clients = max(clients, count)
+            # every poller fires once within an interval of starting, measure from then on
+            time.sleep(max(callback['interval'] for callback in callbacks))
+
+            before = _readStats(port, stats_dir)
+            start = time.monotonic()
+            time.sleep(duration)
+            end = time.monotonic()
+            after = _readStats(port, stats_dir)
+            samples = recorder.window(start, end)
+            per_worker = [{
+                'pid': pid,
+                'db_queries_per_sec': round((stats['pool']['checkouts'] - before.get(pid, {'pool': {'checkouts': 0}})['pool']['checkouts']) / duration, 2),
+                'db_pool_waits': stats['pool']['waits'] - before.get(pid, {'pool': {'waits': 0}})['pool']['waits'],
+                'cpu_pct': round(100.0 * (stats['cpu'] - before.get(pid, {'cpu': 0.0})['cpu']) / duration, 2),
+                'threads': stats['threads'],
+            } for pid, stats in sorted(after.items())]
+
+            result = {
+                'clients': count,
+                'requests': len(samples),
+                'requests_per_sec': round(len(samples) / duration, 2),
+                'errors': sum(1 for sample in samples if sample[3] not in (200, 204)),
+                'late_pct': round(100.0 * sum(1 for sample in samples if sample[4]) / max(len(samples), 1), 2),
+                'db_queries_per_sec': round(sum(worker['db_queries_per_sec'] for worker in per_worker), 2),
+                'db_pool_waits': sum(worker['db_pool_waits'] for worker in per_worker),
+                'server_cpu_pct': round(sum(worker['cpu_pct'] for worker in per_worker), 2),
+                'workers': per_worker,
+            }
+            result.update(_percentiles([sample[2] for sample in samples]))
+            result['callbacks'] = {
+                callback['name']: _percentiles([sample[2] for sample in samples if sample[1] == callback['name']])
+                for callback in callbacks
+            }
+            results.append(result)
+        return {
+            'rows': rows,
+            'server': server,
+            'workers': workers if server == "gunicorn" else 1,
+            'callbacks': [{'name': callback['name'], 'trigger': callback['trigger'], 'interval': callback['interval']} for callback in callbacks],
+            'steps': results,
+        }
+    finally:
+        stop.set()
+        process.terminate()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,10,50", help="comma separated client counts")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--interval", type=float, default=None, help="seconds between ticks instead of the layout's")
+    parser.add_argument("--ingest-every", type=float, default=10.0)
+    parser.add_argument("--ingest-rows", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "weatheralytics-bench"))
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--server", choices=("gunicorn", "werkzeug"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)))
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+    steps = [int(count) for count in args.clients.split(",")]
+    print(json.dumps(run(steps, args.duration, args.rows, args.data_dir, args.seed, args.interval,
+                         args.ingest_every, args.ingest_rows, args.port, args.server, args.workers), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Idle viewer test for the live update channel.
+Starts the deployed server, gunicorn with gunicorn.conf.py (gthread, SSE_MAX_STREAMS + CALLBACK_THREADS
+threads per worker), serving the /events/data endpoint and a SnapshotWatcher whose refresh only counts
+calls, then opens more and more idle viewers and reports server CPU, snapshot refreshes/sec, events
+delivered, streams turned away and the latency of a chart request made while they are connected at
+every step. With --mode poll each viewer instead fires the six chart requests every --poll-interval
+seconds, the way dcc.Interval used to, for comparison. --server werkzeug runs the threaded development
+server instead.
+
+Usage: python -m benchmarks.idle_viewers --viewers 0,10,50,200 --duration 10
+"""
+# Standard Imports
+import argparse
+import http.client
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+# Custom Imports
+from db.signal import data_signal
+from live.events import SnapshotWatcher, registerEvents
+
+CHARTS = 6
+
+def createServer(watch_interval=1.0, change_every=5.0):
+    """
+    API to build the test server: the events endpoint, a counting watcher, /poll standing in for a chart request and /stats
+    Input: watch_interval (seconds between watcher polls), change_every (seconds between new data versions, 0 for never)
+    Output: Flask app, gunicorn loads it with benchmarks.idle_viewers:createServer(...)
+    """
+    from flask import Flask, jsonify
+
+    server = Flask(__name__)
+    counters = {'refreshes': 0, 'polls': 0}
+    started = time.monotonic()
+
+    def refresh():
+        counters['refreshes'] += 1
+        if change_every and time.monotonic() - started >= change_every * (data_signal.version + 1):
+            data_signal.publish(data_signal.version + 1)
+
+    watcher = SnapshotWatcher(refresh=refresh, interval=watch_interval)
+    registerEvents(server, watcher)
+
+    @server.route("/poll")
+    def poll():
+        counters['polls'] += 1
+        refresh()
+        return jsonify(version=data_signal.version)
+
+    @server.route("/stats")
+    def stats():
+        return jsonify(cpu=time.process_time(), threads=threading.active_count(), version=data_signal.version, **counters)
+
+    watcher.start()
+    return server
+
+def serve(port, watch_interval, change_every):
+    """
+    API to run the test server on the threaded werkzeug server in this process until it is killed
+    Input: port, watch_interval, change_every
+    Output: None
+    """
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    make_server("127.0.0.1", port, createServer(watch_interval, change_every), threaded=True).serve_forever()
+
+def _get(port, path):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.request("GET", path)
+    body = connection.getresponse().read()
+    connection.close()
+    return json.loads(body)
+
+def _requestLatency(port, requests=5):
+    """
+    Median seconds of a /poll request, made while the viewers are connected
+    """
+    seconds = []
+    for _ in range(requests):
+        start = time.monotonic()
+        _get(port, "/poll")
+        seconds.append(time.monotonic() - start)
+    return sorted(seconds)[len(seconds) // 2]
+
+class Viewer(threading.Thread):
+    """
+    One idle dashboard: holds an SSE connection open and counts data events,
+    or in poll mode requests every chart each poll_interval seconds.
+    """
+
+    def __init__(self, port, mode, poll_interval, stop):
+        super().__init__(daemon=True)
+        self.port = port
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.stop = stop
+        self.events = 0
+        self.rejected = False
+
+    def run(self):
+        try:
+            if self.mode == "poll":
+                while not self.stop.wait(self.poll_interval):
+                    for _ in range(CHARTS):
+                        _get(self.port, "/poll")
+                        self.events += 1
+                return
+            connection = http.client.HTTPConnection("127.0.0.1", self.port)
+            connection.request("GET", "/events/data")
+            response = connection.getresponse()
+            if response.status != 200:
+                # over SSE_MAX_STREAMS, the browser keeps polling instead
+                self.rejected = True
+                connection.close()
+                return
+            while not self.stop.is_set():
+                line = response.fp.readline()
+                if not line:
+                    break
+                if line.startswith(b"data:"):
+                    self.events += 1
+            connection.close()
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+
+def run(steps, duration, mode, poll_interval, port, watch_interval, change_every, server="gunicorn", workers=1):
+    """
+    API to start the server and measure it at every viewer count
+    Input: steps (List of viewer counts), duration (seconds per step), mode ("sse" or "poll"), poll_interval, port, watch_interval, change_every,
+           server ("gunicorn" or "werkzeug"), workers (gunicorn worker processes, stats come from whichever answers)
+    Output: List of Dicts, one per step
+    """
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers), "--bind", "127.0.0.1:{}".format(port),
+                   "benchmarks.idle_viewers:createServer({}, {})".format(watch_interval, change_every)]
+    else:
+        command = [sys.executable, "-m", "benchmarks.idle_viewers", "--serve", "--port", str(port),
+                   "--watch-interval", str(watch_interval), "--change-every", str(change_every)]
+    process = subprocess.Popen(command)
+    try:
+        for _ in range(300):
+            try:
+                _get(port, "/stats")
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        results = []
+        stop = threading.Event()
+        viewers = []
+        for count in steps:
+            while len(viewers) < count:
+                viewer = Viewer(port, mode, poll_interval, stop)
+                viewer.start()
+                viewers.append(viewer)
+            time.sleep(1.0)
+
+            before = _get(port, "/stats")
+            events = sum(viewer.events for viewer in viewers)
+            time.sleep(duration)
+            latency = _requestLatency(port)
+            after = _get(port, "/stats")
+            events = sum(viewer.events for viewer in viewers) - events
+
+            results.append({
+                'viewers': count,
+                'mode': mode,
+                'server': server,
+                'server_cpu_pct': round(100.0 * (after['cpu'] - before['cpu']) / duration, 2),
+                'refreshes_per_sec': round((after['refreshes'] - before['refreshes']) / duration, 2),
+                'requests_per_sec': round((after['polls'] - before['polls']) / duration, 2),
+                'events_per_sec': round(events / duration, 2),
+                'server_threads': after['threads'],
+                'streams_rejected': sum(1 for viewer in viewers if viewer.rejected),
+                'request_latency_ms': round(latency * 1000, 2),
+            })
+        stop.set()
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", default="0,10,50,200", help="comma separated viewer counts")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mode", choices=("sse", "poll"), default="sse")
+    parser.add_argument("--poll-interval", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--watch-interval", type=float, default=1.0)
+    parser.add_argument("--change-every", type=float, default=5.0)
+    parser.add_argument("--server", choices=("gunicorn", "werkzeug"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.watch_interval, args.change_every)
+        return
+    steps = [int(count) for count in args.viewers.split(",")]
+    print(json.dumps(run(steps, args.duration, args.mode, args.poll_interval, args.port, args.watch_interval, args.change_every,
+                         args.server, args.workers), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Offline throughput test for the ingestion pipeline.
+Publishes synthetic readings through FakeBroker into IngestService and reports messages/sec and peak
+per-stage queue lengths. The database is replaced by a sink that sleeps --db-latency ms per batch,
+so the numbers show the ceiling of the pipeline itself for a given write latency.
+The service runs one writer by default (INGEST_WRITERS). With --writers above 1 batches commit out of id order
+and the dashboard snapshot only picks up a batch that commits within SNAPSHOT_GAP_TIMEOUT seconds of a later one,
+so those numbers are a ceiling to compare against, not a deployment setting.
+
+Usage: python -m benchmarks.ingest_throughput --messages 200000 --db-latency 5 [--writers 2]
+"""
+# Standard Imports
+import argparse
+import json
+import threading
+import time
+
+# Custom Imports
+from db.writer import WeatherDataWriter
+from ingestion.fakebroker import FakeBroker, sample_payload
+from ingestion.service import IngestService
+
+TOPIC = "weatheralytics/data"
+
+def run(messages, publishers, parsers, writers, batch_size, db_latency, max_queue):
+    """
+    API to push messages through a fresh pipeline and measure it
+    Input: messages, publishers, parsers, writers, batch_size, db_latency (ms per batch), max_queue
+    Output: Dict of results
+    """
+    def sink(batch):
+        if db_latency:
+            time.sleep(db_latency / 1000.0)
+        return len(batch)
+
+    broker = FakeBroker()
+    writer = WeatherDataWriter(batch_size=batch_size, flush_interval=0.05, max_queue=max_queue, sink=sink, workers=writers)
+    service = IngestService(broker, TOPIC, writer=writer, parsers=parsers, max_queue=max_queue).start()
+
+    payloads = [sample_payload(index) for index in range(min(messages, 10000))]
+    peaks = {'receive_queue': 0, 'write_queue': 0}
+    done = threading.Event()
+
+    def monitor():
+        while not done.is_set():
+            stats = service.stats()
+            for stage in peaks:
+                peaks[stage] = max(peaks[stage], stats[stage])
+            time.sleep(0.05)
+
+    def publish(offset):
+        for index in range(offset, messages, publishers):
+            broker.publish(TOPIC, payloads[index % len(payloads)])
+
+    threading.Thread(target=monitor, daemon=True).start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=publish, args=(offset,)) for offset in range(publishers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    published = time.perf_counter() - start
+    service.stop()
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    stats = service.stats()
+    return {
+        'messages': messages,
+        'publishers': publishers,
+        'parsers': parsers,
+        'writers': writers,
+        'batch_size': batch_size,
+        'db_latency_ms': db_latency,
+        'publish_seconds': published,
+        'total_seconds': elapsed,
+        'messages_per_sec': stats['written'] / elapsed,
+        'written': stats['written'],
+        'malformed': stats['malformed'],
+        'batches': stats['batches'],
+        'peak_receive_queue': peaks['receive_queue'],
+        'peak_write_queue': peaks['write_queue'],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--publishers", type=int, default=1)
+    parser.add_argument("--parsers", type=int, default=1)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--db-latency", type=float, default=5.0, help="simulated milliseconds per batch insert")
+    parser.add_argument("--max-queue", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.messages, args.publishers, args.parsers, args.writers, args.batch_size, args.db_latency, args.max_queue), indent=2))
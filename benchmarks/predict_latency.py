@@ -0,0 +1,84 @@
+"""
+Prediction benchmark: the pickled sklearn forest against the flattened FlatForest.
+Reports file size, in-memory array bytes, single-row latency (the dashboard button) and batch
+throughput, and checks that both give identical predictions and probabilities on random inputs
+drawn from the ranges of the dashboard sliders.
+
+Usage: python -m benchmarks.predict_latency --model model/weathermodel.pickle --rows 10000
+"""
+# Standard Imports
+import argparse
+import json
+import os
+import pickle
+import time
+import numpy as np
+
+# Custom Imports
+from predictor.flatforest import FlatForest, flattenForest, verifyForest
+
+# temperature, apparent temperature, humidity, wind speed, wind bearing, visibility, pressure
+SLIDER_RANGES = [(-20, 40), (-30, 40), (0, 1), (0, 70), (0, 359), (0, 20), (950, 1050)]
+
+def sampleInputs(rows, seed=0):
+    """
+    API to draw random readings within the slider ranges
+    Input: rows (Int), seed (Int)
+    Output: NumPy float64 array of shape (rows, 7)
+    """
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(low, high, rows) for low, high in SLIDER_RANGES])
+
+def _perCall(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+def run(model_path, rows, calls):
+    """
+    API to compare both predictors
+    Input: model_path (String: pickled RandomForestClassifier), rows (Int: batch size), calls (Int: single-row repetitions)
+    Output: Dict of results
+    """
+    with open(model_path, "rb") as readFile:
+        model = pickle.load(readFile)
+    arrays = flattenForest(model)
+    forest = FlatForest(arrays)
+    X = sampleInputs(rows)
+    # sklearn warns when fitted with feature names and called without them
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        import pandas as pd
+        X_model = pd.DataFrame(X, columns=names)
+    else:
+        X_model = X
+
+    start = time.perf_counter()
+    forest.predict(X)
+    flat_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    model.predict(X_model)
+    sklearn_batch = time.perf_counter() - start
+
+    return {
+        'trees': len(forest.root),
+        'split_nodes': len(forest.threshold),
+        'leaves': len(forest.leaf_value),
+        'identical': verifyForest(model, forest, X_model),
+        'pickle_bytes': os.path.getsize(model_path),
+        'flat_array_bytes': forest.nbytes,
+        'sklearn_single_row_seconds': _perCall(lambda: model.predict(X_model[:1]), calls),
+        'flat_single_row_seconds': _perCall(lambda: forest.predict(X[:1]), calls),
+        'sklearn_rows_per_sec': rows / sklearn_batch,
+        'flat_rows_per_sec': rows / flat_batch,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="model/weathermodel.pickle")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.model, args.rows, args.calls), indent=2))
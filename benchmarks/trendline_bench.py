@@ -0,0 +1,131 @@
+"""
+Trendline benchmark: graphobjects.trendlines against the plotly express trendline path it replaced.
+For every trend option and row count it times the reference px.scatter(trendline=...) figure, the
+NumPy trendline alone and the full createTrendPlot figure (figures including JSON serialization, as
+Dash sends them), and reports the largest absolute
+difference between the reference and the NumPy trend values.
+With --ticks it also replays a live window of --rows rows sliding by --new-rows per tick and times
+the incremental TrendState against recomputing trendLine on every tick.
+The reference path needs statsmodels for the OLS options, they are skipped when it is not installed.
+
+Usage: python -m benchmarks.trendline_bench --rows 5000,96000 --x-axis reading_time --y-axis temperature
+"""
+# Standard Imports
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Custom Imports
+from graphobjects.plots import createTrendPlot, trenddict
+from graphobjects.trendlines import trendLine
+from graphobjects.trendstate import TrendState
+
+REFERENCE_OPTIONS = {
+    'ols': dict(trendline="ols"),
+    'olslog': dict(trendline="ols", trendline_options=dict(log_x=True)),
+    '5ptrolling': dict(trendline="rolling", trendline_options=dict(window=5)),
+    'rollmedian': dict(trendline="rolling", trendline_options=dict(function="median", window=5)),
+    'expandmax': dict(trendline="expanding", trendline_options=dict(function="max")),
+    'expomavg': dict(trendline="ewm", trendline_options=dict(halflife=2)),
+}
+
+def sampleFrame(rows, seed=0):
+    """
+    API to build hourly readings with a seasonal temperature and humidity rounded like the dataset
+    Input: rows (Int), seed (Int)
+    Output: Pandas DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    hours = np.arange(rows)
+    temperature = 12 + 10 * np.sin(2 * np.pi * hours / 8766) + 5 * np.sin(2 * np.pi * hours / 24) + rng.normal(0, 2, rows)
+    return pd.DataFrame({
+        'reading_time': pd.date_range("2006-01-01", periods=rows, freq="h", tz="UTC"),
+        'temperature': temperature,
+        'humidity': np.clip(np.round(0.75 - 0.015 * (temperature - 12) + rng.normal(0, 0.1, rows), 2), 0.01, 1.0),
+    })
+
+def _timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run(rows, x_axis, y_axis, repeat):
+    """
+    API to benchmark every trend option at one row count
+    Input: rows (Int), x_axis, y_axis, repeat (Int: best of)
+    Output: List of Dicts, one per trend option
+    """
+    data = sampleFrame(rows)
+    results = []
+    for trend, options in REFERENCE_OPTIONS.items():
+        result = {'rows': rows, 'trend': trend, 'x_axis': x_axis, 'y_axis': y_axis}
+        try:
+            reference = px.scatter(data, x=x_axis, y=y_axis, title=trenddict[trend], **options)
+            reference = np.asarray(reference.data[1].y, dtype=np.float64)
+            _, result['reference_seconds'] = _timed(lambda: px.scatter(data, x=x_axis, y=y_axis, title=trenddict[trend], **options).to_json(), repeat)
+        except ImportError:
+            reference = None
+        (_, values, _), result['numpy_trend_seconds'] = _timed(lambda: trendLine(data, x_axis, y_axis, trend), repeat)
+        _, result['figure_seconds'] = _timed(lambda: createTrendPlot(data, x_axis, y_axis, trend).to_json(), repeat)
+        if reference is not None:
+            both = ~(np.isnan(reference) | np.isnan(values))
+            result['max_abs_diff'] = float(np.max(np.abs(reference[both] - values[both]))) if both.any() else 0.0
+            result['nan_positions_match'] = bool(np.array_equal(np.isnan(reference), np.isnan(values)))
+            result['speedup'] = result['reference_seconds'] / result['figure_seconds']
+        results.append(result)
+    return results
+
+def runStreaming(rows, new_rows, ticks, y_axis):
+    """
+    API to time per-tick trend updates over a sliding window of the live table
+    Input: rows (Int: window size), new_rows (Int: rows arriving per tick), ticks (Int), y_axis
+    Output: List of Dicts, one per trend option
+    """
+    data = sampleFrame(rows + new_rows * ticks)
+    data.insert(0, 'id', np.arange(1, len(data) + 1))
+    windows = [data.iloc[tick * new_rows:rows + tick * new_rows] for tick in range(ticks + 1)]
+    results = []
+    for trend in REFERENCE_OPTIONS:
+        state = TrendState(trend, "reading_time", y_axis)
+        state.update(windows[0])
+        start = time.perf_counter()
+        for window in windows[1:]:
+            _, incremental, _ = state.update(window)
+        streaming = (time.perf_counter() - start) / ticks
+        start = time.perf_counter()
+        for window in windows[1:]:
+            _, full, _ = trendLine(window, "reading_time", y_axis, trend)
+        recompute = (time.perf_counter() - start) / ticks
+        results.append({
+            'rows': rows,
+            'new_rows_per_tick': new_rows,
+            'trend': trend,
+            'streaming_seconds_per_tick': streaming,
+            'recompute_seconds_per_tick': recompute,
+            'max_abs_diff': float(np.nanmax(np.abs(incremental - full))),
+            'rebuilds': state.rebuilds,
+        })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="5000,96000", help="comma separated row counts")
+    parser.add_argument("--x-axis", default="reading_time")
+    parser.add_argument("--y-axis", default="temperature")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ticks", type=int, default=0, help="live ticks to replay, 0 to skip the streaming test")
+    parser.add_argument("--new-rows", type=int, default=10)
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows.split(","):
+        results.extend(run(int(rows), args.x_axis, args.y_axis, args.repeat))
+        if args.ticks:
+            results.extend(runStreaming(int(rows), args.new_rows, args.ticks, args.y_axis))
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,101 @@
+"""
+Per-worker model memory test.
+Starts --workers processes that each load the model one way and run one prediction, like gunicorn
+workers serving the dashboard, then reports every worker's load time, resident (rss), shared and
+proportional (pss) memory while all of them are alive.
+Modes: mmap (memory-mapped model directory, pages shared), copy (same arrays read into private
+memory) and pickle (the sklearn forest unpickled per worker).
+
+Usage: python -m benchmarks.worker_memory --model model/weathermodel.pickle --workers 4
+"""
+# Standard Imports
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+# Custom Imports
+from predictor.flatforest import FlatForest, flattenForest, saveForest
+from predictor.loader import processMemory
+
+MODES = ("mmap", "copy", "pickle")
+SAMPLE = [[10.0, 8.0, 0.8, 10.0, 200.0, 10.0, 1010.0]]
+
+def child(mode, path):
+    """
+    API run in every worker process: load, predict once, report when asked
+    Input: mode (one of MODES), path (model directory, or pickle file for mode pickle)
+    Output: None (prints one JSON line)
+    """
+    baseline = processMemory()
+    start = time.perf_counter()
+    if mode == "pickle":
+        # fitted with feature names, called with a plain list like FlatForest
+        warnings.simplefilter("ignore", UserWarning)
+        with open(path, "rb") as readFile:
+            model = pickle.load(readFile)
+    else:
+        model = FlatForest.load(path, mmap=(mode == "mmap"))
+    model.predict(SAMPLE)
+    loaded = time.perf_counter() - start
+    print("ready", flush=True)
+    sys.stdin.readline()
+    memory = processMemory()
+    print(json.dumps({'mode': mode, 'pid': os.getpid(), 'load_and_predict_seconds': loaded,
+                      'rss_mb': memory.get('rss', memory['peak_rss']) / 2**20,
+                      'rss_added_mb': (memory.get('rss', 0) - baseline.get('rss', 0)) / 2**20,
+                      'shared_mb': memory.get('shared', 0) / 2**20,
+                      'pss_mb': memory.get('pss', 0) / 2**20}), flush=True)
+
+def run(pickle_path, workers, modes):
+    """
+    API to start the workers of every mode and collect their reports
+    Input: pickle_path (String: pickled RandomForestClassifier), workers (Int per mode), modes (List)
+    Output: List of Dicts, one per mode with the per-worker reports
+    """
+    with open(pickle_path, "rb") as readFile:
+        arrays = flattenForest(pickle.load(readFile))
+    with tempfile.TemporaryDirectory() as directory:
+        flat_path = os.path.join(directory, "weathermodel.flat")
+        saveForest(arrays, flat_path)
+        results = []
+        for mode in modes:
+            path = pickle_path if mode == "pickle" else flat_path
+            processes = [subprocess.Popen([sys.executable, "-m", "benchmarks.worker_memory", "--child", mode, path],
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+            for process in processes:
+                process.stdout.readline()
+            reports = []
+            for process in processes:
+                process.stdin.write("report\n")
+                process.stdin.flush()
+                reports.append(json.loads(process.stdout.readline()))
+            for process in processes:
+                process.stdin.close()
+                process.wait()
+            results.append({
+                'mode': mode,
+                'workers': workers,
+                'total_pss_mb': sum(report['pss_mb'] for report in reports),
+                'mean_load_and_predict_seconds': sum(report['load_and_predict_seconds'] for report in reports) / workers,
+                'reports': reports,
+            })
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="model/weathermodel.pickle")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+    else:
+        print(json.dumps(run(args.model, args.workers, args.modes.split(",")), indent=2))
@@ -1,45 +1,92 @@
-#Recommend to perform this stage on Google Colab instead of local PC - 8 threads can bubble RAM usage to over 40GB
-import pandas as pd
-from dataset.dataCleaning import cleanData
-from db.connection import get_weatherData
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split as tts
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score,recall_score,precision_score,f1_score,roc_auc_score,average_precision_score
+#Streams weatherHistory into compact float32 arrays and fits the forest within --memory-mb (default TRAIN_MEMORY_MB),
+#the number of parallel tree builders and, if the table does not fit, a uniform sample of it are chosen to stay inside it
+#--max-samples draws fewer readings per tree (subsampled bootstrap), which lowers the memory of every builder
+#--search SECONDS first tries configurations on a process pool and trains the one picked from the F1/latency/size frontier
+import argparse
+import os
 import pickle
+import time
+import numpy as np
+from db.connection import get_weatherData_extent
+from predictor.flatforest import FlatForest, flattenForest, saveForest, verifyForest
+from predictor.loader import processMemory
+from predictor.search import candidates, pickModel, search
+from predictor.training import HOLDOUT_EVERY, RSEED, TRAIN_CHUNK, TRAIN_MEMORY_MB, VERIFY_ROWS, loadTrainingData, planTraining, rowLatency, scoreModel, trainForest
 
-RSEED = 12345
+def maxSamples(value):
+    #share of the training rows when it has a decimal point, a row count otherwise
+    return float(value) if "." in value else int(value)
 
-#dataprep
-data = get_weatherData()
-data = cleanData(data)
+parser = argparse.ArgumentParser(description="Train the precipitation model within a memory budget")
+parser.add_argument("--memory-mb", type=int, default=TRAIN_MEMORY_MB)
+parser.add_argument("--trees", type=int, default=100)
+parser.add_argument("--depth", type=int, default=16)
+parser.add_argument("--max-samples", type=maxSamples, default=None)
+parser.add_argument("--jobs", type=int, default=8)
+parser.add_argument("--max-rows", type=int, default=None, help="train on a uniform sample of at most this many readings")
+parser.add_argument("--chunk-rows", type=int, default=TRAIN_CHUNK)
+parser.add_argument("--min-samples-leaf", type=int, default=1)
+parser.add_argument("--search", type=float, default=None, metavar="SECONDS", help="search hyperparameters for this long first")
+parser.add_argument("--search-workers", type=int, default=None, help="processes for the search, as many as the budget allows by default")
+parser.add_argument("--f1-tolerance", type=float, default=0.005, help="F1 a faster or smaller model may give up")
+args = parser.parse_args()
 
-#drop non numeric data
-data.drop(['reading_time'], axis=1, inplace=True)
-data.drop(['summary'], axis=1, inplace=True)
+started = time.perf_counter()
+timings = {}
 
-#convert precip_type from categorical to numerical (only 3 classes)
-le = LabelEncoder()
-data['precip_type']=le.fit_transform(data['precip_type'])
+#dataprep: features and precip_type (none/rain/snow as 0/1/2) streamed into training and the fixed test slice (ids divisible by HOLDOUT_EVERY)
+available = get_weatherData_extent()[0]
+if args.max_rows is not None:
+    available = min(available, args.max_rows)
+plan = planTraining(args.memory_mb * 2**20, available, args.trees, args.depth, args.max_samples, args.jobs, test_size=1 / HOLDOUT_EVERY)
+X_train, y_train, X_test, y_test, info = loadTrainingData(plan['rows'], seed=RSEED, chunk_size=args.chunk_rows, holdout_every=HOLDOUT_EVERY)
+timings['load'] = time.perf_counter() - started
+print("Loaded {train_rows} training and {test_rows} test readings of {table_rows} ({rows_skipped} skipped), {mb:.1f} MB".format(mb=info['matrix_bytes'] / 2**20, **info))
 
+#search: candidates fit on 80% of the training readings and are scored on the other 20%
+config = {'n_estimators': args.trees, 'max_depth': args.depth, 'max_samples': args.max_samples, 'min_samples_leaf': args.min_samples_leaf}
+if args.search:
+    split = int(len(X_train) * 0.8)
+    report = lambda result: print("  f1 {f1:.4f}  {latency_us:7.2f} us/row  {model_bytes:>10} bytes  {config}".format(**result))
+    found = search(X_train[:split], y_train[:split], X_train[split:], y_train[split:], candidates(), args.search, args.search_workers or plan['n_jobs'], RSEED, report)
+    print("Searched {evaluated} configurations in {seconds:.0f}s ({abandoned} not finished, {failed} failed), frontier:".format(**found))
+    for result in found['frontier']:
+        report(result)
+    picked = pickModel(found['frontier'], args.f1_tolerance)
+    if picked is not None:
+        config = picked['config']
+    timings['search'] = time.perf_counter() - started - sum(timings.values())
+    print("Picked {}".format(config))
 
-#select y as precip_type for this model
-x = data.iloc[:,1:]
-y = data.iloc[:,0]
+#train model with as many parallel tree builders as the budget allows
+rf = trainForest(X_train, y_train, n_jobs=plan['n_jobs'], seed=RSEED, **config)
+timings['fit'] = time.perf_counter() - started - sum(timings.values())
+print("Trained {} trees on {} threads".format(config['n_estimators'], plan['n_jobs']))
 
-#split 30% for test
-X_train, X_test, y_train, y_test = tts(x,y,test_size=0.3,random_state=RSEED)
+#export flattened model used by the dashboard, it must predict exactly like rf
+flat = flattenForest(rf)
+#readings up to this id are in the model, the retrain job (predictor/retrain.py) adds trees for later ones
+flat['trained_id'] = np.array(info['max_id'], dtype=np.int64)
+forest = FlatForest(flat)
+if not verifyForest(rf, forest, X_test[:VERIFY_ROWS]):
+    raise RuntimeError("Flattened model does not reproduce the trained forest")
 
-#train model, set parallel threads to 8 for speedier training
-rf = RandomForestClassifier(max_depth=16,random_state=RSEED,n_jobs=8)
-rf.fit(X_train,y_train)
-y_pred = rf.predict(X_test)
+#model performance, predicted in batches by the flattened model
+scores = scoreModel(forest, X_test, y_test)
+timings['evaluate'] = time.perf_counter() - started - sum(timings.values())
+print("Accuracy Score {}".format(scores['accuracy']))
+print("Recall Score {}".format(scores['recall']))
+print("Precision Score {}".format(scores['precision']))
+print("F1 Score {}".format(scores['f1']))
+print("Latency {:.2f} us per row".format(rowLatency(forest, X_test) * 1e6))
 
-#model performance
-print("Accuracy Score {}".format(accuracy_score(y_test,y_pred)))
-print("Recall Score {}".format(recall_score(y_test,y_pred,average='weighted')))
-print("Precision Score {}".format(precision_score(y_test,y_pred,average='weighted')))
-print("F1 Score {}".format(f1_score(y_test,y_pred,average='weighted')))
+#dump pickle model, model/ is not tracked so it may not exist yet
+os.makedirs('model', exist_ok=True)
+with open('model/weathermodel.pickle', 'wb') as writeFile:
+    pickle.dump(rf, writeFile)
+saveForest(flat, 'model/weathermodel.flat')
+timings['save'] = time.perf_counter() - started - sum(timings.values())
+print("Model Size {} bytes pickled, {} bytes flattened".format(os.path.getsize('model/weathermodel.pickle'), forest.nbytes))
 
-#dump pickle model
-pickle.dump(rf, open('model/weathermodel.pickle','wb'))
\ No newline at end of file
+print("Wall Time {:.1f}s ({})".format(time.perf_counter() - started, ", ".join("{} {:.1f}s".format(phase, seconds) for phase, seconds in timings.items())))
+print("Peak RSS {:.0f} MB of {} MB budget".format(processMemory()['peak_rss'] / 2**20, args.memory_mb))
@@ -6,11 +6,14 @@ def cleanData(df):
     API to take pandas dataframe as argument, perform standard cleaning as per research done earlier
     1. Convert Formatted Date column to datetime format for easier manipulation
     2. Replace Null values in Precip Type to string value "none"
+    Columns missing from a projected dataframe, or already typed by db.connection, are left untouched
 
     Input: df (Pandas DataFrame)
     Output: Pandas DataFrame
     """
-    df['reading_time'] = pd.to_datetime(df['reading_time'], utc=True)
-    df['precip_type'] = df['precip_type'].replace(np.nan, "none")
+    if 'reading_time' in df and not (isinstance(df['reading_time'].dtype, pd.DatetimeTZDtype) and str(df['reading_time'].dt.tz) == "UTC"):
+        df['reading_time'] = pd.to_datetime(df['reading_time'], utc=True)
+    if 'precip_type' in df and df['precip_type'].isna().any():
+        df['precip_type'] = df['precip_type'].replace(np.nan, "none")
 
     return df
@@ -0,0 +1,75 @@
+import numpy as np
+
+"""
+Synthetic weatherHistory readings for benchmarks and offline runs, shaped like the original
+2006-2016 dataset: readings spread evenly over SYNTHETIC_YEARS from 2006 (hourly at ~100k rows, every
+few seconds at 10M) with seasonal and daily temperature cycles, humidity that rises as it cools,
+rain or snow (below 0 C) on humid readings and summaries that follow humidity and visibility.
+"""
+SYNTHETIC_START = np.datetime64("2006-01-01T00:00:00", "s")
+SYNTHETIC_YEARS = 11
+SUMMARIES = np.array(["Clear", "Partly Cloudy", "Mostly Cloudy", "Overcast", "Foggy"], dtype=object)
+
+def syntheticReadings(rows, seed=0, first=0, total=None):
+    """
+    API to generate readings rows [first, first + rows) of a synthetic table of total rows
+    The same seed, first and total always give the same readings, so a table can be built in chunks
+    Input: rows (Int), seed (Int), first (Int: position of the first reading), total (Int: table size, None for rows)
+    Output: Dict of NumPy arrays keyed by weatherHistory column (without id), reading_time as 'YYYY-MM-DD HH:MM:SS' strings
+    """
+    total = rows if total is None else total
+    rng = np.random.default_rng([seed, first])
+    position = np.arange(first, first + rows)
+    seconds = position * (SYNTHETIC_YEARS * 365.25 * 86400 / max(total, 1))
+    reading_time = SYNTHETIC_START + seconds.astype("timedelta64[s]")
+    year_phase = 2 * np.pi * (seconds % (365.25 * 86400)) / (365.25 * 86400)
+    day_phase = 2 * np.pi * (seconds % 86400) / 86400
+
+    temperature = 11 - 11 * np.cos(year_phase) - 4 * np.cos(day_phase) + rng.normal(0, 3, rows)
+    humidity = np.clip(0.75 + 0.15 * np.cos(day_phase) - 0.01 * (temperature - 11) + rng.normal(0, 0.08, rows), 0.1, 1.0)
+    wind_speed = rng.gamma(2.0, 5.5, rows)
+    # colder with wind, warmer with humid heat
+    apparent_temperature = temperature - 0.12 * wind_speed * (temperature < 10) + 3 * np.clip(temperature - 25, 0, None) * humidity
+    wind_bearing = rng.integers(0, 360, rows)
+    visibility = np.clip(16 - 14 * np.clip(humidity - 0.7, 0, None) / 0.3 + rng.normal(0, 1.5, rows), 0, 16.1)
+    pressure = 1016 - 8 * (humidity - 0.75) / 0.25 + rng.normal(0, 6, rows)
+
+    wet = (humidity > 0.88) & (rng.random(rows) < 0.7)
+    precip_type = np.full(rows, None, dtype=object)
+    precip_type[wet] = np.where(temperature[wet] < 0, "snow", "rain")
+    cloud = np.clip(((humidity - 0.4) / 0.15 + rng.normal(0, 0.7, rows)).astype(int), 0, 3)
+    summary = SUMMARIES[np.where(visibility < 4, 4, cloud)]
+
+    return {
+        'reading_time': np.char.replace(np.datetime_as_string(reading_time, unit="s"), "T", " "),
+        'summary': summary,
+        'precip_type': precip_type,
+        'temperature': np.round(temperature, 4),
+        'apparent_temperature': np.round(apparent_temperature, 4),
+        'humidity': np.round(humidity, 2),
+        'wind_speed': np.round(wind_speed, 4),
+        'wind_bearing': wind_bearing,
+        'visibility': np.round(visibility, 4),
+        'pressure': np.round(pressure, 2),
+    }
+
+def syntheticRows(readings):
+    """
+    API to turn generated readings into row tuples ordered like the add_weatherData arguments
+    Input: readings (Dict from syntheticReadings)
+    Output: List of tuples
+    """
+    columns = ('reading_time', 'summary', 'precip_type', 'temperature', 'apparent_temperature', 'humidity', 'wind_speed', 'wind_bearing', 'visibility', 'pressure')
+    return list(zip(*(readings[name].tolist() for name in columns)))
+
+def fillDatabase(add_batch, rows, seed=0, chunk_size=50000, first=0):
+    """
+    API to write a synthetic table of rows readings in chunks, for example through add_weatherData_batch
+    Input: add_batch (function writing a list of row tuples, returns the count), rows (Int: table size),
+           seed (Int), chunk_size (Int), first (Int: readings already written, to continue a table)
+    Output: Int (readings written)
+    """
+    written = 0
+    for start in range(first, rows, chunk_size):
+        written += add_batch(syntheticRows(syntheticReadings(min(chunk_size, rows - start), seed, start, rows)))
+    return written
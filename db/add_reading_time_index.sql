@@ -0,0 +1,2 @@
+USE weatheralytics;
+CREATE INDEX idx_reading_time ON weatherHistory (reading_time);
@@ -1,6 +1,8 @@
 # Instructions for DB connection
 """
 The connection string is stored in privatekeys.py, uncomment Line 6 to 12 / Line 15 to 21, and remove Line 27 to use your own details.
+Without privatekeys.py the details are read from the HOST, USER, PASSWORD and DB environment variables, and with
+WEATHER_SQLITE set to a file path a local SQLite database (db/sqlite.py) is used instead of MySQL.
 
 Sample Config for Custom Deployment
 config = {
@@ -23,114 +25,370 @@ config = {
 
 # Standard Imports
 from mysql.connector import connect, errorcode, Error
+from mysql.connector.errors import DataError, IntegrityError, PoolError
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-from .privatekeys import config
+from .rollups import ROLLUP_COLUMNS, RollupStore
+from .signal import data_signal
 import os
+import queue
+import threading
+import time
 
-def get_weatherData():
+try:
+  from .privatekeys import config
+except ImportError:
+  config = {
+    'host': os.environ.get('HOST', "localhost"),
+    'user': os.environ.get('USER'),
+    'password': os.environ.get('PASSWORD'),
+    'database': os.environ.get('DB', "weatheralytics"),
+    'raise_on_warnings': True,
+  }
+
+WEATHER_SQLITE = os.environ.get("WEATHER_SQLITE")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", 30))
+SNAPSHOT_REFRESH = float(os.environ.get("SNAPSHOT_REFRESH", 1.0))
+SNAPSHOT_GAP_TIMEOUT = float(os.environ.get("SNAPSHOT_GAP_TIMEOUT", 30))
+FETCH_CHUNK = int(os.environ.get("FETCH_CHUNK", 10000))
+
+WEATHER_COLUMNS = ('id', 'reading_time', 'summary', 'precip_type', 'temperature', 'apparent_temperature', 'humidity', 'wind_speed', 'wind_bearing', 'visibility', 'pressure')
+
+"""
+Storage type of every weatherHistory column once decoded, columns not listed stay as Python objects
+"""
+COLUMN_TYPES = {
+  'id': 'int64',
+  'reading_time': 'datetime64[us]',
+  'summary': 'category',
+  'precip_type': 'category',
+  'temperature': 'float64',
+  'apparent_temperature': 'float64',
+  'humidity': 'float64',
+  'wind_speed': 'float64',
+  'wind_bearing': 'int64',
+  'visibility': 'float64',
+  'pressure': 'float64',
+}
+
+class ConnectionPool:
+  """
+  Fixed-size pool of database connections shared by every query function in this module.
+  Connections are opened lazily, pinged before reuse once they have been idle for ping_after seconds,
+  and always handed back through the connection() context manager, including when the query fails.
+  The pool starts empty again after a fork so gunicorn workers never share sockets.
+  """
+
+  def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, ping_after=DB_POOL_PING_AFTER):
+    self.factory = factory
+    self.size = size
+    self.timeout = timeout
+    self.ping_after = ping_after
+    self._reset()
+
+  def _reset(self):
+    self._pid = os.getpid()
+    self._idle = queue.LifoQueue()
+    self._slots = threading.BoundedSemaphore(self.size)
+    self._stats_lock = threading.Lock()
+    self.in_use = 0
+    self.created = 0
+    self.checkouts = 0
+    self.waits = 0
+    self.wait_time = 0.0
+
+  def _acquire(self):
+    """
+    Reserve a slot, waiting up to timeout seconds when every connection is checked out
+    """
+    if self._slots.acquire(blocking=False):
+      return 0.0
+    start = time.monotonic()
+    if not self._slots.acquire(timeout=self.timeout):
+      raise PoolError("No database connection available after {}s (pool size {})".format(self.timeout, self.size))
+    return time.monotonic() - start
+
+  def _checkout(self):
+    """
+    Return a healthy idle connection, or open a new one
+    """
+    while True:
+      try:
+        cnx, released = self._idle.get_nowait()
+      except queue.Empty:
+        cnx = self.factory()
+        with self._stats_lock:
+          self.created += 1
+        return cnx
+      if time.monotonic() - released < self.ping_after or cnx.is_connected():
+        return cnx
+      self._discard(cnx)
+
+  def _discard(self, cnx):
+    try:
+      cnx.close()
+    except Exception:
+      pass
+
+  @contextmanager
+  def connection(self):
+    """
+    API to check a connection out of the pool for the duration of a with block
+    Input: None
+    Output: Database connection (returned to the pool on exit)
+    """
+    if os.getpid() != self._pid:
+      self._reset()
+
+    waited = self._acquire()
+    try:
+      cnx = self._checkout()
+    except BaseException:
+      self._slots.release()
+      raise
+
+    with self._stats_lock:
+      self.in_use += 1
+      self.checkouts += 1
+      if waited:
+        self.waits += 1
+        self.wait_time += waited
+
+    healthy = True
+    try:
+      yield cnx
+    except BaseException:
+      healthy = False
+      raise
+    finally:
+      try:
+        # End any read transaction so the next user sees rows committed since
+        if cnx.in_transaction:
+          cnx.rollback()
+      except Exception:
+        healthy = False
+      if healthy:
+        self._idle.put((cnx, time.monotonic()))
+      else:
+        self._discard(cnx)
+      with self._stats_lock:
+        self.in_use -= 1
+      self._slots.release()
+
+  def stats(self):
+    """
+    API to read the pool counters
+    Input: None
+    Output: Dict (size, in_use, idle, created, checkouts, waits, wait_time)
+    """
+    with self._stats_lock:
+      return {
+        'size': self.size,
+        'in_use': self.in_use,
+        'idle': self._idle.qsize(),
+        'created': self.created,
+        'checkouts': self.checkouts,
+        'waits': self.waits,
+        'wait_time': self.wait_time,
+      }
+
+def _connect():
+  """
+  Open a connection to the configured database: SQLite when WEATHER_SQLITE is set, MySQL otherwise
+  MySQL sessions run in UTC, so reading_time bounds and values mean the same as in the snapshot and rollups
+  """
+  if WEATHER_SQLITE:
+    from .sqlite import connectSqlite
+    return connectSqlite(WEATHER_SQLITE)
+  return connect(**dict(config, time_zone="+00:00"))
+
+db_pool = ConnectionPool(_connect)
+
+def _print_error(err):
+  """
+  Report a database error the same way for every API below
+  """
+  if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
+    print("Something is wrong with your user name or password")
+  elif err.errno == errorcode.ER_BAD_DB_ERROR:
+    print("Database does not exist")
+  else:
+    print(err)
+
+def _read_frame(cursor, chunk_size=FETCH_CHUNK):
+  """
+  Stream a result set with fetchmany into preallocated typed NumPy arrays and wrap them in a dataframe
+  reading_time becomes UTC datetime64 and summary/precip_type categoricals with nulls as "none",
+  which is what cleanData would produce, so the full list of row tuples is never held in memory
+  """
+  names = cursor.column_names
+  dtypes = [COLUMN_TYPES.get(name, 'object') for name in names]
+  arrays = [np.empty(chunk_size, dtype=object if dtype == 'category' else dtype) for dtype in dtypes]
+  count = 0
+  while True:
+    rows = cursor.fetchmany(chunk_size)
+    if not rows:
+      break
+    end = count + len(rows)
+    if end > len(arrays[0]):
+      capacity = max(end, 2 * len(arrays[0]))
+      grown = []
+      for array in arrays:
+        bigger = np.empty(capacity, dtype=array.dtype)
+        bigger[:count] = array[:count]
+        grown.append(bigger)
+      arrays = grown
+    for array, values in zip(arrays, zip(*rows)):
+      array[count:end] = values
+    count = end
+
+  data = {}
+  for name, dtype, array in zip(names, dtypes, arrays):
+    array = array[:count]
+    if dtype == 'category':
+      array[pd.isna(array)] = "none"
+      data[name] = pd.Categorical(array)
+    elif dtype.startswith('datetime64'):
+      data[name] = pd.DatetimeIndex(array).tz_localize("UTC")
+    else:
+      data[name] = array
+  return pd.DataFrame(data, columns=list(names), copy=False)
+
+def _query(query, params=()):
+  """
+  Run a select on a pooled connection and return the result set as a typed dataframe
+  """
+  with db_pool.connection() as cnx:
+    cursor = cnx.cursor()
+    cursor.execute(query, params)
+    return _read_frame(cursor)
+
+def _append_frame(frame, new):
+  """
+  Concatenate two decoded frames, merging category sets so categorical columns stay categorical
+  """
+  combined = pd.concat([frame, new], ignore_index=True)
+  for name in frame.columns:
+    if isinstance(frame[name].dtype, pd.CategoricalDtype) and not isinstance(combined[name].dtype, pd.CategoricalDtype):
+      combined[name] = pd.api.types.union_categoricals([frame[name], new[name]], ignore_order=True)
+  return combined
+
+
+def _select_list(columns):
+  """
+  Build the select list for a query, only accepting known weatherHistory columns
+  """
+  if columns is None:
+    return "*"
+  unknown = [column for column in columns if column not in WEATHER_COLUMNS]
+  if unknown:
+    raise ValueError("Unknown weatherHistory column(s): {}".format(", ".join(unknown)))
+  return ", ".join(dict.fromkeys(columns))
+
+def get_weatherData(columns=None):
   """
   API to query data for all available weather data from the database
-  Input: None
+  Input: columns (List of column names, None for all)
   Output: Pandas Dataframe
   """
   try:
-    cnx = connect(**config)
-    cursor = cnx.cursor()
-    cursor.execute("select * from weatherHistory")
-    records = cursor.fetchall()
-    
-    df = pd.DataFrame(records)
-    df.columns = cursor.column_names
-    return df
+    return _query("select {} from weatherHistory".format(_select_list(columns)))
 
   except Error as err:
-    if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-      print("Something is wrong with your user name or password")
-    elif err.errno == errorcode.ER_BAD_DB_ERROR:
-      print("Database does not exist")
-    else:
-      print(err)
-  else:
-    cnx.close()
+    _print_error(err)
 
-def get_weatherData_byCount(n):
+def get_weatherData_byCount(n, columns=None):
   """
   API to query data for last 'n' records from available weather data from the database
-  Input: n (Int: count)
+  Input: n (Int: count), columns (List of column names, None for all)
   Output: Pandas Dataframe
   """
   try:
-    cnx = connect(**config)
-    cursor = cnx.cursor()
-    cursor.execute("select * from weatherHistory order by id desc limit {}".format(n))
-    records = cursor.fetchall()
-    
-    df = pd.DataFrame(records)
-    df.columns = cursor.column_names
-    return df
+    return _query("select {} from weatherHistory order by id desc limit %s".format(_select_list(columns)), (int(n),))
 
   except Error as err:
-    if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-      print("Something is wrong with your user name or password")
-    elif err.errno == errorcode.ER_BAD_DB_ERROR:
-      print("Database does not exist")
-    else:
-      print(err)
-  else:
-    cnx.close()
+    _print_error(err)
 
-def get_weatherData_byYear(n):
+def get_weatherData_byRange(start, end, columns=None):
   """
-  API to query data for particular year from available weather data from the database
-  Input: n (String: year value)
+  API to query data with start <= reading_time < end from available weather data from the database
+  Uses plain range predicates so the reading_time index (db/add_reading_time_index.sql) can be used
+  Input: start, end (String 'YYYY-MM-DD[ HH:MM:SS]' or datetime, naive values are UTC), columns (List of column names, None for all)
   Output: Pandas Dataframe
   """
+  bounds = tuple(_utc_timestamp(value).tz_localize(None).to_pydatetime() for value in (start, end))
   try:
-    cnx = connect(**config)
-    cursor = cnx.cursor()
-    cursor.execute("select * from weatherHistory where reading_time like '{}%'".format(n))
-    records = cursor.fetchall()
-    
-    df = pd.DataFrame(records)
-    df.columns = cursor.column_names
-    return df
+    return _query("select {} from weatherHistory where reading_time >= %s and reading_time < %s order by id".format(_select_list(columns)), bounds)
 
   except Error as err:
-    if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-      print("Something is wrong with your user name or password")
-    elif err.errno == errorcode.ER_BAD_DB_ERROR:
-      print("Database does not exist")
-    else:
-      print(err)
-  else:
-    cnx.close()
+    _print_error(err)
+
+def get_weatherData_byYear(n, columns=None):
+  """
+  API to query data for particular year from available weather data from the database
+  Input: n (String: year value), columns (List of column names, None for all)
+  Output: Pandas Dataframe
+  """
+  return get_weatherData_byRange("{}-01-01".format(n), "{}-01-01".format(int(n) + 1), columns)
 
-def get_weatherData_bySummary(summary):
+def get_weatherData_bySummary(summary, columns=None):
   """
   API to query all available weather data for defined summary (for eg. Clear, Foggy etc.)
-  Input: summary 
+  Input: summary, columns (List of column names, None for all)
   Output: Pandas Dataframe
   """
+  try:
+    return _query("select {} from weatherHistory where summary=%s".format(_select_list(columns)), (summary,))
+
+  except Error as err:
+    _print_error(err)
 
+def get_weatherData_extent():
+  """
+  API to query how many records there are and the highest id, to size a read before streaming it
+  Input: None
+  Output: Tuple (count, max id), (0, 0) for an empty table
+  """
   try:
-    cnx = connect(**config)
-    cursor = cnx.cursor()
-    cursor.execute("select * from weatherHistory where summary={}".format(summary))
-    records = cursor.fetchall()
-    
-    df = pd.DataFrame(records)
-    df.columns = cursor.column_names
-    return df
+    with db_pool.connection() as cnx:
+      cursor = cnx.cursor()
+      cursor.execute("select count(*), max(id) from weatherHistory")
+      count, max_id = cursor.fetchone()
+      return int(count), int(max_id or 0)
 
   except Error as err:
-    if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-      print("Something is wrong with your user name or password")
-    elif err.errno == errorcode.ER_BAD_DB_ERROR:
-      print("Database does not exist")
-    else:
-      print(err)
-  else:
-    cnx.close()
+    _print_error(err)
+
+def get_weatherData_chunks(columns, chunk_size=FETCH_CHUNK, max_id=None, after_id=None):
+  """
+  API to stream records in id order without holding the table, one keyset page (id > last id) per query
+  Rows stay raw tuples so the caller can convert them straight into compact arrays
+  Input: columns (List of column names, id is always read first), chunk_size (Int: rows per page),
+         max_id (Int: last id to read, None for all), after_id (Int: read ids above it only, None for all)
+  Output: Generator of Lists of row tuples (id first), a database error is printed and raised
+  """
+  select = _select_list(['id'] + [column for column in columns if column != 'id'])
+  bound = "" if max_id is None else " and id <= %s"
+  last_id = -1 if after_id is None else int(after_id)
+  while True:
+    try:
+      with db_pool.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute("select {} from weatherHistory where id > %s{} order by id limit %s".format(select, bound),
+                       (last_id,) + (() if max_id is None else (int(max_id),)) + (int(chunk_size),))
+        rows = cursor.fetchall()
+    except Error as err:
+      _print_error(err)
+      raise
+    if not rows:
+      return
+    yield rows
+    last_id = rows[-1][0]
+
+INSERT_QUERY = "INSERT INTO weatherHistory(reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, pressure) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
 
 def add_weatherData(reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, pressure):
   """
@@ -138,18 +396,269 @@ def add_weatherData(reading_time, summary, precip_type, temperature, apparent_te
   Input: reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, pressure
   Output: None
   """
+  add_weatherData_batch([(reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, pressure)])
+
+def add_weatherData_batch(rows):
+  """
+  API to add many weather readings to the database in a single transaction
+  A batch the database rejects for its data (DataError/IntegrityError) is split in halves and retried,
+  so one bad row only drops itself, connection errors still fail the whole batch
+  Input: rows (List of tuples ordered like the add_weatherData arguments)
+  Output: Int (number of rows written, rejected rows are not counted)
+  """
+  if not rows:
+    return 0
   try:
-    cnx = connect(**config)
-    cursor = cnx.cursor()
-    cursor.execute("INSERT INTO weatherHistory(reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, pressure) VALUES ('{}','{}','{}','{}','{}','{}','{}','{}','{}','{}')".format(reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, pressure))
+    with db_pool.connection() as cnx:
+      cursor = cnx.cursor()
+      cursor.executemany(INSERT_QUERY, rows)
+      cnx.commit()
+
+  except (DataError, IntegrityError) as err:
+    if len(rows) == 1:
+      _print_error(err)
+      return 0
+    middle = len(rows) // 2
+    return add_weatherData_batch(rows[:middle]) + add_weatherData_batch(rows[middle:])
 
   except Error as err:
-    if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-      print("Something is wrong with your user name or password")
-    elif err.errno == errorcode.ER_BAD_DB_ERROR:
-      print("Database does not exist")
-    else:
-      print(err)
-  else:
-    cnx.commit()
-    cnx.close()
+    _print_error(err)
+    return 0
+
+  data_signal.poke()
+  return len(rows)
+
+
+def _utc_timestamp(value):
+  """
+  Interpret a range bound as UTC, the way cleanData interprets naive reading times
+  """
+  value = pd.Timestamp(value)
+  return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+def _window_rows(frame, start, end):
+  """
+  Rows of a snapshot frame with start <= reading_time < end: a slice found by binary search when the
+  frame is in time order, otherwise a boolean mask
+  """
+  times = frame['reading_time']
+  if frame.attrs.get('time_sorted'):
+    first = 0 if start is None else int(times.searchsorted(_utc_timestamp(start), side='left'))
+    last = len(frame) if end is None else int(times.searchsorted(_utc_timestamp(end), side='left'))
+    return slice(first, max(first, last))
+  mask = np.ones(len(frame), dtype=bool)
+  if start is not None:
+    mask &= (times >= _utc_timestamp(start)).to_numpy()
+  if end is not None:
+    mask &= (times < _utc_timestamp(end)).to_numpy()
+  return mask
+
+class WeatherSnapshot:
+  """
+  Process-wide columnar copy of the weatherHistory table shared by every dashboard callback.
+  The first refresh loads the whole table, later refreshes only fetch rows above the id watermark,
+  so database traffic follows the ingest rate instead of the number of viewers and charts.
+  Rows can commit out of id order (several writers or ingest processes), so the watermark stops below the
+  first missing id: the rows above it are read again and skipped by id until the gap fills, or until
+  gap_timeout seconds after the row above the gap was fetched, when the id is taken as never used
+  (a rolled back insert). Gaps already there at the first load are taken as never used.
+  Rows are kept in the order they were fetched and the data version is the number of rows held.
+  Refreshes closer together than min_interval seconds are served from memory.
+  Every fetched row is also folded into the hourly/daily/monthly rollups.
+  The frame and rollup tables of a refresh are published together as one view, a caller that reads view
+  once and passes it to every slice below gets rows and a version that all belong to the same refresh.
+  """
+
+  def __init__(self, min_interval=SNAPSHOT_REFRESH, gap_timeout=SNAPSHOT_GAP_TIMEOUT):
+    self.min_interval = min_interval
+    self.gap_timeout = gap_timeout
+    self.view = (None, None)
+    self.rollups = RollupStore()
+    self.version = 0
+    self.watermark = 0
+    self.pending = {}
+    self.last_refresh = None
+    self._lock = threading.Lock()
+
+  def _advance(self, ids, now):
+    """
+    Move the watermark over the fetched ids, stopping below the first missing id that may still commit
+    """
+    ids = ids.to_numpy()
+    if not self.pending and len(ids) and ids[0] == self.watermark + 1 and ids[-1] - ids[0] + 1 == len(ids):
+      self.watermark = int(ids[-1])
+      return
+    for row_id in ids:
+      self.pending[int(row_id)] = now
+    for row_id in sorted(self.pending):
+      if row_id != self.watermark + 1 and now - self.pending[row_id] < self.gap_timeout:
+        break
+      self.watermark = row_id
+      del self.pending[row_id]
+
+  def refresh(self, force=False):
+    """
+    API to pull rows above the id watermark that are not held yet into the snapshot
+    Input: force (Bool: ignore min_interval)
+    Output: Int (data version, the number of rows held)
+    """
+    with self._lock:
+      now = time.monotonic()
+      if not force and self.last_refresh is not None and now - self.last_refresh < self.min_interval:
+        return self.version
+
+      try:
+        new = _query("select * from weatherHistory where id > %s order by id", (self.watermark,))
+
+      except Error as err:
+        _print_error(err)
+        return self.version
+
+      self.last_refresh = now
+      if self.pending and len(new):
+        new = new[~new['id'].isin(list(self.pending))].reset_index(drop=True)
+      if self.frame is None:
+        self.watermark = int(new['id'].iloc[-1]) if len(new) else 0
+      elif len(new) or self.pending:
+        self._advance(new['id'], now)
+
+      if len(new) or self.frame is None:
+        # Readers hold references to the previous frame, so it is replaced rather than modified
+        frame = new if self.frame is None else _append_frame(self.frame, new)
+        # Readings normally arrive in time order, which lets windows be found by binary search
+        times = new['reading_time']
+        frame.attrs['time_sorted'] = bool(times.is_monotonic_increasing and (self.frame is None or not len(new) or not len(self.frame)
+                                          or (self.frame.attrs.get('time_sorted') and times.iloc[0] >= self.frame['reading_time'].iloc[-1])))
+        self.view = (frame, self.rollups.update(new))
+        if len(new):
+          self.version = len(frame)
+          data_signal.publish(self.version)
+      return self.version
+
+  @property
+  def frame(self):
+    return self.view[0]
+
+  def _frame(self, view):
+    return (self.view if view is None else view)[0]
+
+  def latest(self, n=None, columns=None, view=None):
+    """
+    API to slice the 'n' most recently fetched records (or every record) from the snapshot, oldest first
+    Input: n (Int: count, None for all records), columns (List of column names, None for all), view (None for the current one)
+    Output: Pandas Dataframe (private copy, safe to modify)
+    """
+    frame = self._frame(view)
+    if frame is None:
+      return None
+    if columns is not None:
+      _select_list(columns)
+      frame = frame[list(dict.fromkeys(columns))]
+    if n is not None:
+      frame = frame.tail(int(n))
+    return frame.copy()
+
+  def window(self, start=None, end=None, columns=None, view=None):
+    """
+    API to slice the records with start <= reading_time < end from the snapshot
+    Input: start, end (String, datetime or None for open ends), columns (List of column names, None for all), view (None for the current one)
+    Output: Pandas Dataframe (private copy, safe to modify)
+    """
+    frame = self._frame(view)
+    if frame is None:
+      return None
+    rows = _window_rows(frame, start, end)
+    if columns is not None:
+      _select_list(columns)
+      frame = frame[list(dict.fromkeys(columns))]
+    return (frame.iloc[rows] if isinstance(rows, slice) else frame[rows]).copy()
+
+  def window_count(self, start=None, end=None, view=None):
+    """
+    API to count the records with start <= reading_time < end without copying them
+    Input: start, end (String, datetime or None for open ends), view (None for the current one)
+    Output: Int
+    """
+    frame = self._frame(view)
+    if frame is None:
+      return 0
+    rows = _window_rows(frame, start, end)
+    return len(range(len(frame))[rows]) if isinstance(rows, slice) else int(rows.sum())
+
+  def since(self, version, columns=None, view=None):
+    """
+    API to slice the records fetched after the snapshot was at data version 'version', oldest first
+    Input: version (Int), columns (List of column names, None for all), view (None for the current one)
+    Output: Pandas Dataframe (private copy, safe to modify)
+    """
+    frame = self._frame(view)
+    if frame is None:
+      return None
+    start = min(int(version), len(frame))
+    if columns is not None:
+      _select_list(columns)
+      frame = frame[list(dict.fromkeys(columns))]
+    return frame.iloc[start:].copy()
+
+  def count(self, view=None):
+    """
+    API to count the records held by the snapshot, which is also its data version
+    Input: view (None for the current one)
+    Output: Int
+    """
+    frame = self._frame(view)
+    return 0 if frame is None else len(frame)
+
+weather_snapshot = WeatherSnapshot()
+
+def get_weatherData_view():
+  """
+  API to refresh the shared snapshot and read it once, pass the result as view to the APIs below so the
+  version and every slice taken during one callback come from the same refresh
+  Input: None
+  Output: Tuple (frame, rollup tables)
+  """
+  weather_snapshot.refresh()
+  return weather_snapshot.view
+
+def get_weatherData_version(view=None):
+  """
+  API to query the data version, the number of rows held by the shared snapshot
+  Input: view (from get_weatherData_view, None to refresh and read the current one)
+  Output: Int
+  """
+  if view is None:
+    return weather_snapshot.refresh()
+  return weather_snapshot.count(view)
+
+def get_weatherData_snapshot(n=None, columns=None, view=None):
+  """
+  API to query the last 'n' records (or all records) through the shared in-process snapshot
+  Input: n (Int: count, None for all records), columns (List of column names, None for all),
+         view (from get_weatherData_view, None to refresh and read the current one)
+  Output: Pandas Dataframe
+  """
+  if view is None:
+    view = get_weatherData_view()
+  return weather_snapshot.latest(n, columns, view)
+
+def get_weatherData_rollup(start=None, end=None, max_points=None, columns=ROLLUP_COLUMNS, view=None):
+  """
+  API to query [start, end) at the resolution that fits max_points: raw rows when there are few enough,
+  otherwise the finest of the hourly/daily/monthly rollups whose bucket count fits
+  Input: start, end (String, datetime or None for open ends), max_points (Int), columns (numeric column names),
+         view (from get_weatherData_view, None to refresh and read the current one)
+  Output: Pandas Dataframe (rollups carry <column>_min/<column>_max and count), attrs['resolution'] is "raw" or the rollup name
+  """
+  if view is None:
+    view = get_weatherData_view()
+  columns = [column for column in columns if column in ROLLUP_COLUMNS]
+  frame, tables = view
+  if frame is None:
+    return None
+  # counted first, so zoomed out requests never copy the raw rows
+  if max_points is None or weather_snapshot.window_count(start, end, view) <= max_points:
+    raw = weather_snapshot.window(start, end, ['id', 'reading_time'] + columns, view)
+    raw.attrs['resolution'] = "raw"
+    return raw
+  return weather_snapshot.rollups.query(start, end, max_points, columns, tables)
@@ -5,3 +5,4 @@ SET GLOBAL local_infile=1;
 LOAD DATA LOCAL INFILE '~/Documents/VSCode/Weatheralytics/dataset/weatherHistory.csv' INTO TABLE weatherHistory FIELDS TERMINATED BY ',' LINES TERMINATED BY '\n' IGNORE 1 ROWS (reading_time, summary, precip_type, temperature, apparent_temperature, humidity, wind_speed, wind_bearing, visibility, loud_cover, pressure, daily_summary, id);
 ALTER TABLE weatherHistory DROP COLUMN loud_cover;
 ALTER TABLE weatherHistory DROP COLUMN daily_summary;
+CREATE INDEX idx_reading_time ON weatherHistory (reading_time);
@@ -0,0 +1,117 @@
+# Standard Imports
+import threading
+import numpy as np
+import pandas as pd
+
+"""
+Numeric weatherHistory columns that are rolled up, and the bucket sizes from finest to coarsest
+"""
+ROLLUP_COLUMNS = ('temperature', 'apparent_temperature', 'humidity', 'wind_speed', 'wind_bearing', 'visibility', 'pressure')
+RESOLUTIONS = (
+  ('hourly', 'datetime64[h]'),
+  ('daily', 'datetime64[D]'),
+  ('monthly', 'datetime64[M]'),
+)
+
+def _utc_naive(values):
+  """
+  Convert reading times (tz-aware, naive or strings) to naive UTC datetime64[ns]
+  """
+  values = pd.to_datetime(pd.Series(values), utc=True)
+  return values.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+
+def _bound(value):
+  if value is None:
+    return None
+  return _utc_naive([value])[0]
+
+def _aggregate(keys, count, sums, mins, maxs):
+  """
+  Merge rows sharing a bucket key: counts and sums add up, minimums and maximums reduce
+  """
+  order = np.argsort(keys, kind='stable')
+  keys = keys[order]
+  starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+  return {
+    'bucket': keys[starts],
+    'count': np.add.reduceat(count[order], starts),
+    'sum': np.add.reduceat(sums[order], starts, axis=0),
+    'min': np.fmin.reduceat(mins[order], starts, axis=0),
+    'max': np.fmax.reduceat(maxs[order], starts, axis=0),
+  }
+
+class RollupStore:
+  """
+  In-memory hourly, daily and monthly count/sum/min/max of every column in ROLLUP_COLUMNS.
+  update() folds newly inserted rows into the existing buckets, so keeping the rollups current costs
+  O(new rows) aggregation plus one table swap. Readers get immutable tables, like WeatherSnapshot.
+  """
+
+  def __init__(self):
+    self.tables = {name: None for name, _ in RESOLUTIONS}
+    self._lock = threading.Lock()
+
+  def update(self, rows):
+    """
+    API to add newly inserted rows to every resolution
+    Input: rows (Pandas DataFrame with reading_time and the numeric columns)
+    Output: Dict (the tables after the update, replaced as a whole so a reader keeps a consistent set)
+    """
+    if not len(rows) or 'reading_time' not in rows:
+      return self.tables
+    times = _utc_naive(rows['reading_time'])
+    values = np.column_stack([
+      rows[column].to_numpy(dtype=np.float64) if column in rows else np.full(len(rows), np.nan)
+      for column in ROLLUP_COLUMNS
+    ])
+    ones = np.ones(len(rows), dtype=np.int64)
+
+    with self._lock:
+      tables = dict(self.tables)
+      for name, unit in RESOLUTIONS:
+        fresh = _aggregate(times.astype(unit), ones, values, values, values)
+        table = tables[name]
+        if table is None:
+          tables[name] = fresh
+          continue
+        # New rows usually land in the last bucket, so only the tail from the earliest new bucket is re-aggregated
+        split = np.searchsorted(table['bucket'], fresh['bucket'][0], side='left')
+        merged = _aggregate(*(np.concatenate([table[key][split:], fresh[key]]) for key in ('bucket', 'count', 'sum', 'min', 'max')))
+        tables[name] = {key: np.concatenate([table[key][:split], merged[key]]) for key in merged}
+      self.tables = tables
+      return tables
+
+  def query(self, start=None, end=None, max_points=None, columns=ROLLUP_COLUMNS, tables=None):
+    """
+    API to read the finest resolution whose bucket count in [start, end) fits max_points
+    Falls back to the coarsest resolution when none fits
+    Input: start, end (String, datetime or None for open ends), max_points (Int, None for hourly), columns,
+           tables (Dict returned by update, None for the current tables)
+    Output: Pandas DataFrame with reading_time (bucket start, UTC), count and per column mean/min/max
+            (mean under the column's own name), attrs['resolution'] names the resolution, None if empty
+    """
+    start, end = _bound(start), _bound(end)
+    tables = self.tables if tables is None else tables
+    chosen = None
+    for name, unit in RESOLUTIONS:
+      table = tables[name]
+      if table is None:
+        return None
+      buckets = table['bucket']
+      lo = 0 if start is None else np.searchsorted(buckets, np.datetime64(start).astype(unit), side='left')
+      hi = len(buckets) if end is None else np.searchsorted(buckets, np.datetime64(end).astype(unit), side='left')
+      chosen = (name, table, lo, hi)
+      if max_points is None or hi - lo <= max_points:
+        break
+
+    name, table, lo, hi = chosen
+    count = table['count'][lo:hi]
+    frame = pd.DataFrame({'reading_time': pd.DatetimeIndex(table['bucket'][lo:hi].astype("datetime64[ns]")).tz_localize("UTC")})
+    for column in columns:
+      position = ROLLUP_COLUMNS.index(column)
+      frame[column] = table['sum'][lo:hi, position] / count
+      frame[column + '_min'] = table['min'][lo:hi, position]
+      frame[column + '_max'] = table['max'][lo:hi, position]
+    frame['count'] = count
+    frame.attrs['resolution'] = name
+    return frame
@@ -0,0 +1,45 @@
+# Standard Imports
+import threading
+
+class DataSignal:
+  """
+  Process-wide "new data" signal.
+  publish() announces a new data version (rows held by the snapshot) to every waiter, poke() tells the snapshot
+  watcher that rows were just written so it refreshes without waiting for its next poll.
+  """
+
+  def __init__(self):
+    self.version = 0
+    self._changed = threading.Condition()
+    self.stale = threading.Event()
+
+  def publish(self, version):
+    """
+    API to announce a data version, older or repeated versions are ignored
+    Input: version (Int)
+    Output: None
+    """
+    with self._changed:
+      if version > self.version:
+        self.version = version
+        self._changed.notify_all()
+
+  def wait(self, since, timeout=None):
+    """
+    API to block until the data version moves past since, or timeout seconds pass
+    Input: since (Int: last version the caller knows), timeout (Float)
+    Output: Int (current version)
+    """
+    with self._changed:
+      self._changed.wait_for(lambda: self.version > since, timeout)
+      return self.version
+
+  def poke(self):
+    """
+    API to flag that new rows were written and the snapshot should refresh soon
+    Input: None
+    Output: None
+    """
+    self.stale.set()
+
+data_signal = DataSignal()
@@ -0,0 +1,122 @@
+# Standard Imports
+from mysql.connector import Error
+from mysql.connector.errors import DataError, IntegrityError
+import datetime
+import sqlite3
+import pandas as pd
+
+"""
+SQLite stand-in for the MySQL server, for benchmarks and offline runs. Connections behave like the
+mysql.connector ones db.connection uses (cursor, column_names, in_transaction, %s placeholders), so
+every query function works unchanged through ConnectionPool. Set WEATHER_SQLITE to a database file to
+use it, reading_time is stored as 'YYYY-MM-DD HH:MM:SS' text in UTC, which compares like the MySQL
+TIMESTAMP column.
+"""
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weatherHistory (id INTEGER PRIMARY KEY AUTOINCREMENT, reading_time TEXT NOT NULL, summary TEXT NOT NULL, precip_type TEXT, temperature REAL NOT NULL, apparent_temperature REAL NOT NULL, humidity REAL NOT NULL, wind_speed REAL NOT NULL, wind_bearing INTEGER NOT NULL, visibility REAL NOT NULL, pressure REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_reading_time ON weatherHistory (reading_time);
+"""
+
+def _param(value):
+  """
+  Store datetimes the way reading_time is stored, as naive UTC text
+  """
+  if isinstance(value, datetime.datetime):
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+      value = value.tz_convert("UTC").tz_localize(None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+  return value
+
+def _error(err):
+  """
+  The mysql.connector error matching a sqlite3 one, so constraint failures are told apart from others
+  """
+  if isinstance(err, sqlite3.IntegrityError):
+    return IntegrityError(msg=str(err))
+  if isinstance(err, sqlite3.DataError):
+    return DataError(msg=str(err))
+  return Error(msg=str(err))
+
+def _translate(query):
+  """
+  MySQL placeholders to SQLite ones
+  """
+  return query.replace("%s", "?")
+
+class SqliteCursor:
+  """
+  The part of the mysql.connector cursor API db.connection uses, over a sqlite3 cursor.
+  """
+
+  def __init__(self, cursor):
+    self._cursor = cursor
+
+  def execute(self, query, params=()):
+    try:
+      self._cursor.execute(_translate(query), [_param(value) for value in params])
+    except sqlite3.Error as err:
+      raise _error(err)
+
+  def executemany(self, query, rows):
+    try:
+      self._cursor.executemany(_translate(query), ([_param(value) for value in row] for row in rows))
+    except sqlite3.Error as err:
+      raise _error(err)
+
+  @property
+  def column_names(self):
+    return tuple(column[0] for column in self._cursor.description or ())
+
+  @property
+  def rowcount(self):
+    return self._cursor.rowcount
+
+  def fetchone(self):
+    return self._cursor.fetchone()
+
+  def fetchmany(self, size):
+    return self._cursor.fetchmany(size)
+
+  def fetchall(self):
+    return self._cursor.fetchall()
+
+class SqliteConnection:
+  """
+  A sqlite3 connection with the mysql.connector connection methods ConnectionPool calls.
+  The pool hands a connection to one thread at a time, so it may move between threads.
+  """
+
+  def __init__(self, path):
+    self._cnx = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    self._open = True
+
+  @property
+  def in_transaction(self):
+    return self._cnx.in_transaction
+
+  def cursor(self):
+    return SqliteCursor(self._cnx.cursor())
+
+  def commit(self):
+    self._cnx.commit()
+
+  def rollback(self):
+    self._cnx.rollback()
+
+  def is_connected(self):
+    return self._open
+
+  def close(self):
+    self._open = False
+    self._cnx.close()
+
+def connectSqlite(path):
+  """
+  API to open a SQLite database with the weatherHistory table, creating both if needed
+  Input: path (String: database file)
+  Output: SqliteConnection
+  """
+  cnx = SqliteConnection(path)
+  cnx._cnx.executescript(SCHEMA)
+  return cnx
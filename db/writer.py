@@ -0,0 +1,124 @@
+# Standard Imports
+import os
+import queue
+import threading
+import time
+
+# Custom Imports
+from .connection import add_weatherData_batch
+
+WRITER_BATCH_SIZE = int(os.environ.get("WRITER_BATCH_SIZE", 500))
+WRITER_FLUSH_INTERVAL = float(os.environ.get("WRITER_FLUSH_INTERVAL", 1.0))
+WRITER_MAX_QUEUE = int(os.environ.get("WRITER_MAX_QUEUE", 10000))
+WRITER_WORKERS = int(os.environ.get("WRITER_WORKERS", 1))
+
+class WeatherDataWriter:
+  """
+  Background writer that buffers parsed readings and inserts them with add_weatherData_batch.
+  A batch is flushed once it holds batch_size rows or its oldest row has waited flush_interval seconds.
+  The queue holds at most max_queue rows; put() blocks when it is full, which pushes back on the producer
+  (for the MQTT subscriber, the network loop stops reading until the database catches up).
+  With workers > 1 several threads drain the same queue and flush batches concurrently, so batches can commit out
+  of id order: the dashboard snapshot drops a batch that commits more than SNAPSHOT_GAP_TIMEOUT seconds after a later one.
+  on_flush, if given, is called with the number of rows written after every successful flush.
+  The default sink retries a rejected batch in smaller pieces, so failed only counts the rows the database refused.
+  """
+
+  def __init__(self, batch_size=WRITER_BATCH_SIZE, flush_interval=WRITER_FLUSH_INTERVAL, max_queue=WRITER_MAX_QUEUE, sink=add_weatherData_batch, workers=WRITER_WORKERS, on_flush=None):
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    self.sink = sink
+    self.on_flush = on_flush
+    self.workers = workers
+    self._queue = queue.Queue(maxsize=max_queue)
+    self._stop = threading.Event()
+    self._stats_lock = threading.Lock()
+    self._threads = []
+    self.written = 0
+    self.failed = 0
+    self.dropped = 0
+    self.batches = 0
+
+  def start(self):
+    """
+    API to start the background flush threads
+    Input: None
+    Output: self
+    """
+    if not self._threads:
+      self._stop.clear()
+      for index in range(self.workers):
+        thread = threading.Thread(target=self._run, name="weather-writer-{}".format(index), daemon=True)
+        thread.start()
+        self._threads.append(thread)
+    return self
+
+  def put(self, row, timeout=None):
+    """
+    API to queue one reading for insertion, blocking while the queue is full
+    Input: row (Tuple ordered like the add_weatherData arguments), timeout (Float: seconds to wait, None waits forever)
+    Output: Bool (False if the row was dropped because the queue stayed full)
+    """
+    try:
+      self._queue.put(row, timeout=timeout)
+      return True
+    except queue.Full:
+      with self._stats_lock:
+        self.dropped += 1
+      return False
+
+  def stop(self, timeout=None):
+    """
+    API to flush everything still queued and stop the background threads
+    Input: timeout (Float: seconds to wait for the final flush of each thread)
+    Output: None
+    """
+    self._stop.set()
+    for thread in self._threads:
+      thread.join(timeout)
+    self._threads = []
+
+  def stats(self):
+    """
+    API to read the writer counters
+    Input: None
+    Output: Dict (queued, written, failed, dropped, batches)
+    """
+    return {
+      'queued': self._queue.qsize(),
+      'written': self.written,
+      'failed': self.failed,
+      'dropped': self.dropped,
+      'batches': self.batches,
+    }
+
+  def _flush(self, batch):
+    written = self.sink(batch)
+    with self._stats_lock:
+      self.batches += 1
+      self.written += written
+      self.failed += len(batch) - written
+    if written and self.on_flush is not None:
+      self.on_flush(written)
+
+  def _run(self):
+    batch = []
+    deadline = None
+    while True:
+      wait = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+      try:
+        batch.append(self._queue.get(timeout=wait))
+        if deadline is None:
+          deadline = time.monotonic() + self.flush_interval
+        # Drain whatever is already waiting without going back to sleep
+        while len(batch) < self.batch_size:
+          batch.append(self._queue.get_nowait())
+      except queue.Empty:
+        pass
+
+      if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or self._stop.is_set()):
+        self._flush(batch)
+        batch = []
+        deadline = None
+      elif not batch and self._stop.is_set() and self._queue.empty():
+        return
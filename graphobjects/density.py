@@ -0,0 +1,34 @@
+# Standard Imports
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from .downsample import asNumeric
+
+def _centers(edges, values):
+    """
+    Bin centers on the original scale of values, so datetime axes keep datetime ticks
+    """
+    centers = (edges[:-1] + edges[1:]) / 2
+    if pd.api.types.is_datetime64_any_dtype(pd.Series(values).dtype):
+        return pd.to_datetime(centers.astype(np.int64))
+    return centers
+
+def densityGrid(data, x_axis, y_axis, x_bins, y_bins):
+    """
+    API to bin a scatter into a 2-D histogram, one cell per few screen pixels
+    The grid size only depends on x_bins and y_bins, never on the number of rows
+    Input: data (Pandas DataFrame), x_axis, y_axis, x_bins, y_bins (Int: cells per axis)
+    Output: Tuple (x centers, y centers, integer counts of shape y_bins x x_bins)
+    """
+    x = asNumeric(data[x_axis])
+    y = asNumeric(data[y_axis])
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    if len(x) == 0:
+        return np.array([]), np.array([]), np.zeros((0, 0), dtype=np.uint32)
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=(x_bins, y_bins))
+    # Small integers keep the serialized grid compact
+    counts = counts.T.astype(np.uint16 if counts.max() < 2 ** 16 else np.uint32)
+    return _centers(x_edges, data[x_axis]), _centers(y_edges, data[y_axis]), counts
@@ -0,0 +1,105 @@
+# Standard Imports
+import numpy as np
+import pandas as pd
+
+def asNumeric(values):
+    """
+    API to view a column as float64 so it can be binned or compared, datetimes become epoch nanoseconds
+    Input: values (Pandas Series or NumPy array)
+    Output: NumPy float64 array
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        if getattr(values.dt, "tz", None) is not None:
+            values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _bucket_edges(n, buckets):
+    """
+    Split n points into equally sized, contiguous buckets and return their start offsets plus n
+    """
+    return np.unique(np.linspace(0, n, buckets + 1).astype(np.int64))
+
+def minmaxIndices(x, y, n_out):
+    """
+    API to downsample a series by keeping the minimum and maximum of every bucket
+    Input: x, y (NumPy arrays sorted by x), n_out (Int: target point count)
+    Output: NumPy array of sorted row positions to keep
+    """
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, n_out // 2)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(edges))
+
+    keep = []
+    for reduce in (np.fmin, np.fmax):
+        extreme = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extreme[bucket])
+        # first hit in each bucket
+        keep.append(hits[np.unique(bucket[hits], return_index=True)[1]])
+    keep.append(np.array([0, n - 1]))
+    return np.unique(np.concatenate(keep))
+
+def lttbIndices(x, y, n_out):
+    """
+    API to downsample a series with Largest-Triangle-Three-Buckets
+    The first and last points are kept, every bucket in between contributes the point forming the largest
+    triangle with the previously kept point and the average of the next bucket.
+    Input: x, y (NumPy arrays sorted by x), n_out (Int: target point count)
+    Output: NumPy array of sorted row positions to keep
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # averages of every bucket, computed at once from cumulative sums
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(ends - starts, 1)
+    avg_x = (sum_x[ends] - sum_x[starts]) / counts
+    avg_y = (sum_y[ends] - sum_y[starts]) / counts
+    # the last bucket looks ahead to the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(len(starts) + 2, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    previous = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends)):
+        if end <= start:
+            keep[bucket + 1] = previous
+            continue
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[previous] - next_x[bucket]) * (by - y[previous]) - (x[previous] - bx) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(area))
+        keep[bucket + 1] = previous
+    return np.unique(keep)
+
+def downsample(data, x_axis, y_axis, n_out, method="minmax"):
+    """
+    API to reduce a time-series dataframe to about n_out rows before it is plotted
+    Rows are ordered by x_axis first and rows with a missing x or y are dropped, as plotly would not draw them
+    Input: data (Pandas DataFrame), x_axis, y_axis, n_out (Int: target point count), method ("minmax" or "lttb")
+    Output: Pandas DataFrame (data itself when it already has n_out rows or fewer)
+    """
+    if len(data) <= n_out:
+        return data
+    if not data[x_axis].is_monotonic_increasing:
+        data = data.sort_values(x_axis, kind="stable")
+
+    x = asNumeric(data[x_axis])
+    y = asNumeric(data[y_axis])
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        data, x, y = data[finite], x[finite], y[finite]
+
+    indices = lttbIndices(x, y, n_out) if method == "lttb" else minmaxIndices(x, y, n_out)
+    return data.iloc[indices]
@@ -0,0 +1,58 @@
+# Standard Imports
+from collections import OrderedDict
+import os
+import threading
+
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", 64))
+
+def figureKey(*parts):
+    """
+    API to build a figure cache key that can also be stored in the browser (dcc.Store)
+    Input: parts (data version, chart id and every input the figure depends on)
+    Output: String
+    """
+    return "|".join(str(part) for part in parts)
+
+class FigureCache:
+    """
+    Bounded LRU cache of built figures shared by every client of this process.
+    Keys include the data version, so a new row makes the old entries unreachable and they age out.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """
+        API to return the cached figure for key, building and storing it on a miss
+        Input: key (String), build (function returning the figure)
+        Output: Plotly Figure
+        """
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # Built outside the lock so slow charts do not hold up the others
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        """
+        API to read the cache counters
+        Input: None
+        Output: Dict (size, maxsize, hits, misses)
+        """
+        with self._lock:
+            return {'size': len(self._figures), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
@@ -3,6 +3,12 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
 import pandas as pd
+import os
+
+# Custom Imports
+from .density import densityGrid
+from .downsample import downsample
+from .trendlines import trendLine
 
 app_color = {"graph_bg": "#252729", "graph_line": "#008019", "trace": "#379C4B", "trend": "#EB4034"}
 
@@ -29,39 +35,148 @@ trenddict={
     'expomavg': 'Exponentially-Weighted Moving Average',
 }
 
-def createPlot(data, x_axis, y_axis):
+"""
+Time-series charts are downsampled on the server before plotting, keeping about POINTS_PER_PIXEL
+points per horizontal pixel of a GRAPH_WIDTH wide graph once they exceed DOWNSAMPLE_THRESHOLD points.
+DOWNSAMPLE_METHOD is "minmax" or "lttb".
+Other scatters with more than DENSITY_THRESHOLD points are drawn as a density heatmap with one
+cell per DENSITY_CELL_PX pixels instead.
+"""
+TIME_AXES = ('reading_time',)
+GRAPH_WIDTH = int(os.environ.get("GRAPH_WIDTH", 1920))
+GRAPH_HEIGHT = 400
+POINTS_PER_PIXEL = float(os.environ.get("POINTS_PER_PIXEL", 2))
+DOWNSAMPLE_METHOD = os.environ.get("DOWNSAMPLE_METHOD", "minmax")
+DOWNSAMPLE_THRESHOLD = int(os.environ.get("DOWNSAMPLE_THRESHOLD", 10000))
+DENSITY_THRESHOLD = int(os.environ.get("DENSITY_THRESHOLD", 20000))
+DENSITY_CELL_PX = int(os.environ.get("DENSITY_CELL_PX", 5))
+
+def pointBudget(width=GRAPH_WIDTH):
     """
-    API to generate plots on demand, apply layout and styling
-    Input: data (Pandas DataFrame), x_axis, y_axis
-    Output: Plotly.Express Figure
+    API to derive how many points a graph of the given width can usefully show
+    Input: width (Int: pixels)
+    Output: Int
     """
-    fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]])
+    return int(width * POINTS_PER_PIXEL)
+
+def plotMode(rows, x_axis, y_axis, width=GRAPH_WIDTH, density_threshold=DENSITY_THRESHOLD):
+    """
+    API to tell how createPlot will draw a chart of the given size
+    Input: rows (Int: row count), x_axis, y_axis, width, density_threshold
+    Output: String ("raw", "downsampled" or "density")
+    """
+    if x_axis == y_axis:
+        return "raw"
+    if x_axis in TIME_AXES:
+        return "downsampled" if rows > max(DOWNSAMPLE_THRESHOLD, pointBudget(width)) else "raw"
+    return "density" if rows > density_threshold else "raw"
 
-    fig.update_layout(title="", plot_bgcolor=app_color["graph_bg"], height=400, paper_bgcolor=app_color["graph_bg"], font=dict(color="White"))
+def traceValues(values):
+    """
+    API to convert a column into plain values for a trace update (extendData), datetimes are sent
+    as naive ISO strings the way plotly express draws tz-aware columns
+    Input: values (Pandas Series)
+    Output: List
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        if getattr(values.dt, "tz", None) is not None:
+            values = values.dt.tz_localize(None)
+        return values.dt.strftime("%Y-%m-%dT%H:%M:%S").tolist()
+    return values.tolist()
+
+def styleFigure(fig, x_axis, y_axis):
+    """
+    API to apply the dashboard layout and axis styling to a figure
+    Input: fig (Plotly Figure), x_axis, y_axis
+    Output: Plotly Figure
+    """
+    fig.update_layout(title="", plot_bgcolor=app_color["graph_bg"], height=GRAPH_HEIGHT, paper_bgcolor=app_color["graph_bg"], font=dict(color="White"))
     fig.update_xaxes(title=labeldict["{}".format(x_axis)], showgrid=False, showline=True, zeroline=False, fixedrange=True)
     fig.update_yaxes(title=labeldict["{}".format(y_axis)], showgrid=True, showline=True, fixedrange=True, zeroline=False, gridcolor=app_color["graph_line"])
     return fig
 
-def createTrendPlot(data, x_axis, y_axis, trend):
+def addRangeBand(fig, data, x_axis, y_axis):
     """
-    API to generate plots with various Linear and Non-Linear trendlines on demand, apply layout and styling
-    Input: data (Pandas DataFrame), x_axis, y_axis, trend
-    Output: Plotly.Express Figure
-    """
-    if (trend == 'ols'):
-        fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]], trendline="ols", title=trenddict["{}".format(trend)], trendline_color_override=app_color["trend"])
-    elif (trend == 'olslog'):
-        fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]], trendline="ols", trendline_options=dict(log_x=True), title=trenddict["{}".format(trend)], trendline_color_override=app_color["trend"])
-    elif (trend == '5ptrolling'):
-        fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]], trendline="rolling", trendline_options=dict(window=5), title=trenddict["{}".format(trend)], trendline_color_override=app_color["trend"])
-    elif (trend == 'rollmedian'):
-        fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]], trendline="rolling", trendline_options=dict(function="median", window=5), title=trenddict["{}".format(trend)], trendline_color_override=app_color["trend"])
-    elif (trend == 'expandmax'):
-        fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]], trendline="expanding", trendline_options=dict(function="max"), title=trenddict["{}".format(trend)], trendline_color_override=app_color["trend"])
-    elif (trend == 'expomavg'):
-        fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]], trendline="ewm", trendline_options=dict(halflife=2), title=trenddict["{}".format(trend)], trendline_color_override=app_color["trend"])
+    API to shade the min-max range of rolled up data behind its mean points
+    The band traces are appended after the scatter so the points stay trace 0
+    Input: fig (Plotly Figure), data (Pandas DataFrame with <y_axis>_min and <y_axis>_max), x_axis, y_axis
+    Output: Plotly Figure
+    """
+    band = dict(x=data[x_axis], mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False)
+    fig.add_trace(go.Scatter(y=data[y_axis + "_max"], **band))
+    fig.add_trace(go.Scatter(y=data[y_axis + "_min"], fill="tonexty", fillcolor="rgba(55, 156, 75, 0.25)", **band))
+    return fig
 
-    fig.update_layout(title="", plot_bgcolor=app_color["graph_bg"], height=400, paper_bgcolor=app_color["graph_bg"], font=dict(color="White"))
-    fig.update_xaxes(title=labeldict["{}".format(x_axis)], showgrid=False, showline=True, zeroline=False, fixedrange=True)
-    fig.update_yaxes(title=labeldict["{}".format(y_axis)], showgrid=True, showline=True, fixedrange=True, zeroline=False, gridcolor=app_color["graph_line"])
-    return fig
\ No newline at end of file
+def createDensityPlot(data, x_axis, y_axis, width=GRAPH_WIDTH):
+    """
+    API to draw a scatter as a 2-D histogram heatmap, the payload size depends on the graph size only
+    Input: data (Pandas DataFrame), x_axis, y_axis, width (Int: graph width in pixels)
+    Output: Plotly Figure
+    """
+    x_centers, y_centers, counts = densityGrid(data, x_axis, y_axis, max(1, width // DENSITY_CELL_PX), max(1, GRAPH_HEIGHT // DENSITY_CELL_PX))
+    fig = go.Figure(go.Heatmap(
+        x=x_centers,
+        y=y_centers,
+        z=counts,
+        # Empty cells (0) stay transparent so the graph background shows through
+        colorscale=[[0, "rgba(0,0,0,0)"], [1e-6, app_color["graph_line"]], [1, "#E6FFEB"]],
+        zmin=0,
+        colorbar=dict(title="Readings"),
+        hovertemplate="%{x}, %{y}<br>%{z} readings<extra></extra>",
+    ))
+    return styleFigure(fig, x_axis, y_axis)
+
+def createPlot(data, x_axis, y_axis, width=GRAPH_WIDTH, density_threshold=DENSITY_THRESHOLD):
+    """
+    API to generate plots on demand, apply layout and styling
+    Time-series data larger than the point budget of the graph width is downsampled first, other
+    scatters above density_threshold points are rendered as a density heatmap
+    Input: data (Pandas DataFrame), x_axis, y_axis, width (Int: graph width in pixels), density_threshold
+    Output: Plotly Figure
+    """
+    mode = plotMode(len(data), x_axis, y_axis, width, density_threshold)
+    if mode == "density":
+        return createDensityPlot(data, x_axis, y_axis, width)
+    if mode == "downsampled":
+        data = downsample(data, x_axis, y_axis, pointBudget(width), DOWNSAMPLE_METHOD)
+
+    fig = px.scatter(data, x=x_axis, y=y_axis, color_discrete_sequence=[app_color["trace"]])
+    if y_axis + "_min" in data and y_axis + "_max" in data:
+        addRangeBand(fig, data, x_axis, y_axis)
+    return styleFigure(fig, x_axis, y_axis)
+
+def addTrendLine(fig, data, x_axis, y_axis, trend, width=GRAPH_WIDTH, line=None):
+    """
+    API to compute a trendline with graphobjects.trendlines and draw it over a figure
+    The line is fitted on every row and downsampled for display like a time-series chart
+    Input: fig (Plotly Figure), data (Pandas DataFrame), x_axis, y_axis, trend (key of trenddict), width (Int: graph width in pixels),
+           line (result of trendLine or TrendState.update already computed for data, None to compute it here)
+    Output: Plotly Figure
+    """
+    x_values, y_values, header = line if line is not None else trendLine(data, x_axis, y_axis, trend)
+    line = pd.DataFrame({x_axis: x_values.reset_index(drop=True), "trend": y_values})
+    if len(line) > DOWNSAMPLE_THRESHOLD:
+        line = downsample(line, x_axis, "trend", pointBudget(width), DOWNSAMPLE_METHOD)
+    x_values = line[x_axis]
+    if pd.api.types.is_datetime64_any_dtype(x_values.dtype) and x_values.dt.tz is not None:
+        # drawn as local time, like plotly express does with tz-aware columns
+        x_values = x_values.dt.tz_localize(None)
+    fig.add_trace(go.Scatter(
+        x=x_values.to_numpy(),
+        y=line["trend"].to_numpy(),
+        mode="lines",
+        line=dict(color=app_color["trend"]),
+        showlegend=False,
+        hovertemplate=header + "{}=%{{x}}<br>{}=%{{y}} <b>(trend)</b><extra></extra>".format(x_axis, y_axis),
+    ))
+    return fig
+
+def createTrendPlot(data, x_axis, y_axis, trend, width=GRAPH_WIDTH, line=None):
+    """
+    API to generate plots with various Linear and Non-Linear trendlines on demand, apply layout and styling
+    The points are drawn like createPlot (downsampled or as a density heatmap when large), the trendline on top
+    Input: data (Pandas DataFrame), x_axis, y_axis, trend, width (Int: graph width in pixels), line (see addTrendLine)
+    Output: Plotly Figure
+    """
+    fig = createPlot(data, x_axis, y_axis, width)
+    return addTrendLine(fig, data, x_axis, y_axis, trend, width, line)
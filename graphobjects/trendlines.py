@@ -0,0 +1,112 @@
+# Standard Imports
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from .downsample import asNumeric
+
+"""
+Trendlines computed with NumPy, matching the plotly express trendline options used by the dashboard:
+rows are sorted by x, datetimes become epoch seconds and rows with a missing x or y are dropped.
+EWM_BLOCK bounds the growth of the weights inside one block of the exponentially weighted mean.
+"""
+EWM_BLOCK = 512
+
+def olsTrend(x, y, log_x=False):
+    """
+    API to fit y = slope * x + intercept by least squares in closed form, optionally against log10(x)
+    Input: x, y (NumPy float64 arrays without NaN), log_x (Bool)
+    Output: Tuple (fitted y, slope, intercept, R squared)
+    """
+    if log_x:
+        if np.any(x <= 0):
+            raise ValueError("Can't do OLS trendline with `log_x=True` when `x`  contains non-positive values.")
+        x = np.log10(x)
+    x_mean, y_mean = x.mean(), y.mean()
+    dx, dy = x - x_mean, y - y_mean
+    sxx, sxy, syy = np.dot(dx, dx), np.dot(dx, dy), np.dot(dy, dy)
+    slope = sxy / sxx if sxx else 0.0
+    intercept = y_mean - slope * x_mean
+    r2 = sxy * sxy / (sxx * syy) if sxx and syy else 0.0
+    return intercept + slope * x, slope, intercept, r2
+
+def rollingTrend(y, window=5, function="mean"):
+    """
+    API to compute a trailing rolling mean or median, the first window - 1 points are NaN
+    Input: y (NumPy float64 array), window (Int), function ("mean" or "median")
+    Output: NumPy float64 array
+    """
+    out = np.full(len(y), np.nan)
+    if len(y) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(y, window)
+        out[window - 1:] = windows.mean(axis=1) if function == "mean" else np.median(windows, axis=1)
+    return out
+
+def expandingMax(y):
+    """
+    API to compute the running maximum
+    Input: y (NumPy float64 array)
+    Output: NumPy float64 array
+    """
+    return np.fmax.accumulate(y) if len(y) else y.copy()
+
+def ewmTrend(y, halflife=2):
+    """
+    API to compute the adjusted exponentially weighted mean, out[t] = sum(w^(t-i) * y[i]) / sum(w^(t-i))
+    The weighted sum is a linear recurrence, it is evaluated as a scaled cumulative sum per block of
+    EWM_BLOCK points with the running total carried from block to block.
+    Input: y (NumPy float64 array), halflife (Float)
+    Output: NumPy float64 array
+    """
+    decay = 0.5 ** (1.0 / halflife)
+    out = np.empty(len(y))
+    carry, weight = 0.0, 0.0
+    for start in range(0, len(y), EWM_BLOCK):
+        block = y[start:start + EWM_BLOCK]
+        powers = decay ** np.arange(len(block))
+        sums = powers * (decay * carry + np.cumsum(block / powers))
+        weights = powers * decay * weight + (1.0 - powers * decay) / (1.0 - decay)
+        out[start:start + len(block)] = sums / weights
+        carry, weight = sums[-1], weights[-1]
+    return out
+
+def _olsLog(x, y):
+    return olsTrend(x, y, log_x=True)
+
+"""
+Trend keys of the dashboard (see trenddict) mapped to (label, function of x and y)
+"""
+TRENDS = {
+    'ols': ("OLS", olsTrend),
+    'olslog': ("OLS", _olsLog),
+    '5ptrolling': ("Rolling mean", lambda x, y: rollingTrend(y, 5, "mean")),
+    'rollmedian': ("Rolling median", lambda x, y: rollingTrend(y, 5, "median")),
+    'expandmax': ("Expanding max", lambda x, y: expandingMax(y)),
+    'expomavg': ("Exponentially Weighted mean", lambda x, y: ewmTrend(y, 2)),
+}
+
+def trendLine(data, x_axis, y_axis, trend):
+    """
+    API to compute a dashboard trendline over a dataframe
+    Input: data (Pandas DataFrame), x_axis, y_axis, trend (key of TRENDS)
+    Output: Tuple (x values sorted, Pandas Series; trend values, NumPy array; hover header, String)
+    """
+    x = asNumeric(data[x_axis])
+    y = asNumeric(data[y_axis])
+    # sorted like px (pandas sort_values): quicksort over the non-missing x, so tied x values keep px's order
+    order = np.flatnonzero(~np.isnan(x))
+    order = order[np.argsort(x[order], kind="quicksort")]
+    order = order[~np.isnan(y[order])]
+    x, y = x[order], y[order]
+    if pd.api.types.is_datetime64_any_dtype(data[x_axis].dtype):
+        x = x / 1e9
+
+    label, function = TRENDS[trend]
+    result = function(x, y)
+    if isinstance(result, tuple):
+        result, slope, intercept, r2 = result
+        x_label = "log10({})".format(x_axis) if trend == 'olslog' else x_axis
+        header = "<b>{} trendline</b><br>{} = {:g} * {} + {:g}<br>R<sup>2</sup>={:f}<br><br>".format(label, y_axis, slope, x_label, intercept, r2)
+    else:
+        header = "<b>{} trendline</b><br><br>".format(label)
+    return data[x_axis].iloc[order], result, header
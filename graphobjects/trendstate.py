@@ -0,0 +1,276 @@
+# Standard Imports
+from collections import OrderedDict
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from .downsample import asNumeric
+from .trendlines import EWM_BLOCK, TRENDS, trendLine
+
+"""
+Rows kept by a TrendState live in preallocated buffers that grow by doubling, dropped rows only move
+the start offset. OLS sums are recomputed from the buffer once as many rows were dropped as are kept,
+so the subtractions cannot drift. EXPAND_CHUNK rows are rescanned at a time when the expanding
+maximum loses its old start.
+"""
+ROLLING_WINDOW = 5
+EWM_HALFLIFE = 2
+EXPAND_CHUNK = 256
+TREND_STATES_SIZE = int(os.environ.get("TREND_STATES_SIZE", 64))
+
+class TrendState:
+    """
+    Incremental trendline for one (trend, x, y) over a sliding window of snapshot rows.
+    update() gets the current window (ordered by id) and only processes the rows that arrived or left
+    since the last call: OLS keeps sufficient statistics, the rolling mean and median keep the last
+    ROLLING_WINDOW - 1 values, the EWM keeps its running weighted sum and weight and the expanding max
+    its running maximum. The result matches trendLine on the same window.
+    Only time axes are appended in order, other x axes, out of order rows or a window that grows at the
+    front are recomputed from scratch.
+    """
+
+    def __init__(self, trend, x_axis, y_axis):
+        self.trend = trend
+        self.x_axis = x_axis
+        self.y_axis = y_axis
+        self.label = TRENDS[trend][0]
+        self.decay = 0.5 ** (1.0 / EWM_HALFLIFE)
+        self.rebuilds = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.start = 0
+        self.end = 0
+        self.dropped = 0
+        self.buffers = {}
+        self.sums = None
+        self.origin = None
+
+    def update(self, data):
+        """
+        API to bring the trendline up to date with the current window
+        Input: data (Pandas DataFrame with id, x_axis and y_axis, ordered by id)
+        Output: Tuple (x values sorted, Pandas Series; trend values, NumPy array; hover header, String)
+        """
+        with self._lock:
+            if not pd.api.types.is_datetime64_any_dtype(data[self.x_axis].dtype):
+                self._reset()
+                return trendLine(data, self.x_axis, self.y_axis, self.trend)
+
+            keep = data[self.x_axis].notna().to_numpy() & data[self.y_axis].notna().to_numpy()
+            ids = data['id'].to_numpy()
+            kept = ids[keep] if not keep.all() else ids
+            if not self._advance(data, kept):
+                self.rebuilds += 1
+                if not self._rebuild(data, keep):
+                    return trendLine(data, self.x_axis, self.y_axis, self.trend)
+            self.updates += 1
+            return data[self.x_axis] if kept is ids else data[self.x_axis][keep], self._values(), self._header()
+
+    def _advance(self, data, kept):
+        """
+        Move the window to kept (ids of the usable rows), False when it cannot be done incrementally
+        """
+        if self.end == self.start or len(kept) == 0:
+            return False
+        ids = self.buffers['id']
+        first = np.searchsorted(ids[self.start:self.end], kept[0]) + self.start
+        if first >= self.end or ids[first] != kept[0]:
+            return False
+        new = len(kept) - (self.end - first)
+        if new < 0 or kept[-1 - new] != ids[self.end - 1]:
+            return False
+
+        rows = data.iloc[int(np.searchsorted(data['id'].to_numpy(), ids[self.end - 1], side='right')):] if new else None
+        if rows is not None:
+            x = asNumeric(rows[self.x_axis]) / 1e9
+            y = asNumeric(rows[self.y_axis])
+            keep = ~(np.isnan(x) | np.isnan(y))
+            x, y, new_ids = x[keep], y[keep], rows['id'].to_numpy()[keep]
+            if len(new_ids) != new or x[0] < self.buffers['x'][self.end - 1]:
+                return False
+            if self.trend == 'olslog' and np.any(x <= 0):
+                return False
+        self._drop(first)
+        if rows is not None:
+            self._append(new_ids, x, y)
+        return True
+
+    def _rebuild(self, data, keep):
+        """
+        Start over from the window, False when its rows are not in time order
+        """
+        self._reset()
+        x = asNumeric(data[self.x_axis])[keep] / 1e9
+        y = asNumeric(data[self.y_axis])[keep]
+        if np.any(np.diff(x) < 0):
+            return False
+        self._append(data['id'].to_numpy()[keep], x, y)
+        return True
+
+    def _grow(self, rows):
+        """
+        Make room for rows more values at the end of every buffer, compacting or doubling them
+        The row before start is kept, the EWM of the window is derived from it
+        """
+        capacity = len(self.buffers['id']) if self.buffers else 0
+        if self.end + rows <= capacity:
+            return
+        first = max(0, self.start - 1)
+        size = self.end - first
+        capacity = max(1024, 2 * (size + rows))
+        old, self.buffers = self.buffers, {}
+        for name in ('id', 'x', 'y', 'trend', 'num', 'den'):
+            self.buffers[name] = np.empty(capacity, dtype=np.int64 if name == 'id' else np.float64)
+            if old:
+                self.buffers[name][:size] = old[name][first:self.end]
+        self.start, self.end = self.start - first, size
+
+    def _append(self, ids, x, y):
+        if self.trend == 'olslog' and np.any(x <= 0):
+            raise ValueError("Can't do OLS trendline with `log_x=True` when `x`  contains non-positive values.")
+        n = len(ids)
+        self._grow(n)
+        b = self.buffers
+        tail = self.end - self.start
+        lo, hi = self.end, self.end + n
+        b['id'][lo:hi], b['x'][lo:hi], b['y'][lo:hi] = ids, x, y
+
+        if self.trend in ('ols', 'olslog'):
+            if self.origin is None:
+                self.origin = (np.log10(x[0]) if self.trend == 'olslog' else x[0]) if n else 0.0
+            self._addSums(x, y, 1.0)
+        elif self.trend in ('5ptrolling', 'rollmedian'):
+            history = b['y'][max(self.start, lo - (ROLLING_WINDOW - 1)):hi]
+            values = np.full(n, np.nan)
+            if len(history) >= ROLLING_WINDOW:
+                windows = np.lib.stride_tricks.sliding_window_view(history, ROLLING_WINDOW)
+                reduced = windows.mean(axis=1) if self.trend == '5ptrolling' else np.median(windows, axis=1)
+                values[n - len(reduced):] = reduced
+            b['trend'][lo:hi] = values
+        elif self.trend == 'expandmax':
+            running = b['trend'][lo - 1] if tail else -np.inf
+            b['trend'][lo:hi] = np.fmax.accumulate(np.concatenate(([running], y)))[1:]
+        elif self.trend == 'expomavg':
+            carry, weight = (b['num'][lo - 1], b['den'][lo - 1]) if tail else (0.0, 0.0)
+            # same blockwise recurrence as trendlines.ewmTrend, continued from the last row
+            for start in range(0, n, EWM_BLOCK):
+                block = y[start:start + EWM_BLOCK]
+                powers = self.decay ** np.arange(len(block))
+                sums = powers * (self.decay * carry + np.cumsum(block / powers))
+                weights = powers * self.decay * weight + (1.0 - powers * self.decay) / (1.0 - self.decay)
+                b['num'][lo + start:lo + start + len(block)] = sums
+                b['den'][lo + start:lo + start + len(block)] = weights
+                carry, weight = sums[-1], weights[-1]
+        self.end = hi
+
+    def _drop(self, first):
+        """
+        Forget the rows before buffer position first
+        """
+        if first == self.start:
+            return
+        b = self.buffers
+        if self.trend in ('ols', 'olslog'):
+            self.dropped += first - self.start
+            if self.dropped > self.end - first:
+                self.start = first
+                self.sums = None
+                self.dropped = 0
+                self._addSums(b['x'][self.start:self.end], b['y'][self.start:self.end], 1.0)
+                return
+            self._addSums(b['x'][self.start:first], b['y'][self.start:first], -1.0)
+        elif self.trend == 'expandmax':
+            lost = b['y'][self.start:first].max()
+            running, position = -np.inf, first
+            while position < self.end:
+                chunk = np.fmax.accumulate(np.concatenate(([running], b['y'][position:position + EXPAND_CHUNK])))[1:]
+                b['trend'][position:position + len(chunk)] = chunk
+                running = chunk[-1]
+                position += len(chunk)
+                # from here on the old values (which included the lost rows) are already right
+                if running >= lost:
+                    break
+        self.start = first
+
+    def _addSums(self, x, y, sign):
+        if self.trend == 'olslog':
+            x = np.log10(x)
+        x = x - self.origin
+        update = sign * np.array([len(x), x.sum(), y.sum(), np.dot(x, x), np.dot(x, y), np.dot(y, y)])
+        self.sums = update if self.sums is None else self.sums + update
+
+    def _fit(self):
+        if self.sums is None or not self.sums[0]:
+            return 0.0, 0.0, 0.0
+        n, sx, sy, sxx, sxy, syy = self.sums
+        sxx, sxy, syy = sxx - sx * sx / n, sxy - sx * sy / n, syy - sy * sy / n
+        slope = sxy / sxx if sxx > 0 else 0.0
+        intercept = sy / n - slope * sx / n
+        r2 = sxy * sxy / (sxx * syy) if sxx > 0 and syy > 0 else 0.0
+        return slope, intercept, r2
+
+    def _values(self):
+        b = self.buffers
+        if self.end == self.start:
+            return np.empty(0)
+        x = b['x'][self.start:self.end]
+        if self.trend in ('ols', 'olslog'):
+            slope, intercept, _ = self._fit()
+            shifted = (np.log10(x) if self.trend == 'olslog' else x) - self.origin
+            return intercept + slope * shifted
+        if self.trend == 'expomavg':
+            num, den = b['num'][self.start:self.end], b['den'][self.start:self.end]
+            if self.start == 0:
+                return num / den
+            # remove what the rows before the window still contribute, it decays to 0 within ~2200 rows
+            head = min(len(num), 2200)
+            factor = self.decay ** np.arange(1, head + 1)
+            values = num / den
+            values[:head] = (num[:head] - factor * b['num'][self.start - 1]) / (den[:head] - factor * b['den'][self.start - 1])
+            return values
+        values = b['trend'][self.start:self.end].copy()
+        if self.trend in ('5ptrolling', 'rollmedian'):
+            values[:ROLLING_WINDOW - 1] = np.nan
+        return values
+
+    def _header(self):
+        if self.trend not in ('ols', 'olslog') or self.end == self.start:
+            return "<b>{} trendline</b><br><br>".format(self.label)
+        slope, intercept, r2 = self._fit()
+        x_label = "log10({})".format(self.x_axis) if self.trend == 'olslog' else self.x_axis
+        # the fit is held around origin, report it in absolute x like trendLine does
+        intercept -= slope * self.origin
+        return "<b>{} trendline</b><br>{} = {:g} * {} + {:g}<br>R<sup>2</sup>={:f}<br><br>".format(self.label, self.y_axis, slope, x_label, intercept, r2)
+
+class TrendStates:
+    """
+    Bounded LRU of TrendStates, one per (trend, x, y, window) shared by every client of this process.
+    The window (data-slider value or Show All) is part of the key, so clients on different windows
+    each keep their own accumulators instead of rebuilding a shared one on every alternating call.
+    """
+
+    def __init__(self, maxsize=TREND_STATES_SIZE):
+        self.maxsize = maxsize
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, trend, x_axis, y_axis, window=None):
+        """
+        API to return the TrendState for a trend chart, creating it on first use
+        Input: trend (key of TRENDS), x_axis, y_axis, window (data-slider value, "all" for Show All)
+        Output: TrendState
+        """
+        with self._lock:
+            key = (trend, x_axis, y_axis, window)
+            if key in self._states:
+                self._states.move_to_end(key)
+            else:
+                self._states[key] = TrendState(trend, x_axis, y_axis)
+                while len(self._states) > self.maxsize:
+                    self._states.popitem(last=False)
+            return self._states[key]
@@ -0,0 +1,29 @@
+"""
+gunicorn settings read from the working directory. gthread workers serve every open /events/data stream
+on its own thread, each worker runs SSE_MAX_STREAMS of them (live/events.py turns further viewers away
+to polling) plus CALLBACK_THREADS that stay free for the Dash callbacks however many wall screens are connected.
+Every worker logs how long it took to start and its memory once the app is imported. The model is
+memory-mapped on first prediction, GET /api/model reports the same numbers later on.
+"""
+# Standard Imports
+import os
+import time
+
+# Custom Imports
+from predictor.loader import processMemory
+
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", 256))
+CALLBACK_THREADS = int(os.environ.get("CALLBACK_THREADS", 16))
+
+worker_class = "gthread"
+threads = SSE_MAX_STREAMS + CALLBACK_THREADS
+# idle streams count as connections too
+worker_connections = max(1000, 2 * threads)
+
+def post_fork(server, worker):
+    worker.boot_started = time.monotonic()
+
+def post_worker_init(worker):
+    memory = processMemory()
+    worker.log.info("Worker %s ready in %.2fs, rss %.1f MB, pss %.1f MB", worker.pid, time.monotonic() - worker.boot_started,
+                    memory.get('rss', memory['peak_rss']) / 2**20, memory.get('pss', 0) / 2**20)
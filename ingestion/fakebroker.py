@@ -0,0 +1,62 @@
+# Standard Imports
+import datetime
+import random
+import threading
+
+class FakeBroker:
+    """
+    In-process stand-in for the MQTT broker with the same subscribe/start/stop interface as MqttSource,
+    so IngestService can be driven offline. publish() delivers synchronously on the caller's thread,
+    like paho delivering on its network thread, so a full pipeline blocks the publisher.
+    """
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.published = 0
+        self._lock = threading.Lock()
+        self._running = False
+
+    def subscribe(self, topic, callback):
+        self.subscriptions.setdefault(topic, []).append(callback)
+
+    def start(self):
+        self._running = True
+
+    def stop(self):
+        self._running = False
+
+    def publish(self, topic, payload):
+        """
+        API to deliver one payload to every subscriber of topic
+        Input: topic, payload (Bytes or String)
+        Output: Int (number of subscribers reached, 0 while stopped)
+        """
+        if not self._running:
+            return 0
+        callbacks = self.subscriptions.get(topic, [])
+        for callback in callbacks:
+            callback(payload)
+        with self._lock:
+            self.published += 1
+        return len(callbacks)
+
+def sample_payload(index, start=datetime.datetime(2017, 1, 1)):
+    """
+    API to build a plausible sensor payload in the format sensorSuscriber expects
+    Input: index (Int: reading number, one reading per minute from start)
+    Output: Bytes
+    """
+    rng = random.Random(index)
+    temperature = rng.uniform(-10, 35)
+    return "{},{},{},{:.4f},{:.4f},{:.2f},{:.2f},{},{:.2f},{:.2f}".format(
+        (start + datetime.timedelta(minutes=index)).strftime("%Y-%m-%d %H:%M:%S"),
+        rng.choice(["Clear", "Partly Cloudy", "Overcast", "Foggy"]),
+        rng.choice(["", "rain", "snow"]),
+        temperature,
+        temperature - rng.uniform(0, 4),
+        rng.uniform(0, 1),
+        rng.uniform(0, 25),
+        rng.randrange(0, 360),
+        rng.uniform(0, 16),
+        rng.uniform(990, 1040),
+    ).encode("utf-8")
@@ -0,0 +1,254 @@
+# Standard Imports
+import datetime
+import math
+import os
+import queue
+import threading
+import time
+
+# Custom Imports
+from db.writer import WeatherDataWriter
+
+INGEST_MAX_QUEUE = int(os.environ.get("INGEST_MAX_QUEUE", 10000))
+INGEST_PARSERS = int(os.environ.get("INGEST_PARSERS", 1))
+# With more than one writer batches commit out of id order, the dashboard snapshot waits SNAPSHOT_GAP_TIMEOUT
+# seconds for a missing id and then drops it, so a batch that commits later than that never reaches the snapshot
+INGEST_WRITERS = int(os.environ.get("INGEST_WRITERS", 1))
+INGEST_REPORT_INTERVAL = float(os.environ.get("INGEST_REPORT_INTERVAL", 30))
+UPDATES_TOPIC = "weatheralytics/updates"
+# weatherHistory column limits (db/importdb.sql): VARCHAR(255) text and a signed 32 bit wind_bearing
+TEXT_MAX_LENGTH = 255
+INT_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+def _reading_time(value):
+    """
+    Parse an ISO reading time into the 'YYYY-MM-DD HH:MM:SS' UTC text the database stores
+    """
+    value = datetime.datetime.fromisoformat(value.strip())
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def _text(value):
+    value = value.strip()
+    if len(value) > TEXT_MAX_LENGTH:
+        raise ValueError("text longer than {} characters".format(TEXT_MAX_LENGTH))
+    return value
+
+def _number(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError("not a finite number")
+    return value
+
+def parse_reading(payload):
+    """
+    API to parse one sensor payload into a row for add_weatherData_batch
+    Payload format (comma separated): reading_time, summary, precip_type, temperature, apparent_temperature,
+    humidity, wind_speed, wind_bearing, visibility, pressure
+    Fields are checked against the table so one bad reading cannot fail the batch it is written with:
+    reading_time must be ISO (naive is UTC), text fits TEXT_MAX_LENGTH, numbers are finite and wind_bearing fits INT_RANGE
+    Input: payload (Bytes or String)
+    Output: Tuple ordered like the add_weatherData arguments, None if the payload is malformed
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", errors="replace")
+    fields = payload.split(",")
+    if len(fields) < 10:
+        return None
+    try:
+        wind_bearing = int(_number(fields[7]))
+        if not INT_RANGE[0] <= wind_bearing <= INT_RANGE[1]:
+            return None
+        return (
+            _reading_time(fields[0]),
+            _text(fields[1]),
+            _text(fields[2]),
+            _number(fields[3]),
+            _number(fields[4]),
+            _number(fields[5]),
+            _number(fields[6]),
+            wind_bearing,
+            _number(fields[8]),
+            _number(fields[9]),
+        )
+    except ValueError:
+        return None
+
+class MqttSource:
+    """
+    Message source backed by a paho MQTT client, subscriptions are renewed on every (re)connect
+    """
+
+    def __init__(self, broker, port=1883):
+        self.broker = broker
+        self.port = port
+        self.subscriptions = {}
+        self.client = None
+
+    def subscribe(self, topic, callback):
+        self.subscriptions[topic] = callback
+
+    def publish(self, topic, payload):
+        if self.client is not None:
+            self.client.publish(topic, payload)
+
+    def start(self):
+        # Imported here so the pipeline can run against FakeBroker without paho installed
+        import paho.mqtt.client as mqtt
+
+        def on_connect(client, userdata, flags, rc):
+            if rc == 0:
+                print("Connection established. Code: " + str(rc))
+                for topic in self.subscriptions:
+                    client.subscribe(topic)
+            else:
+                print("Connection failed. Code: " + str(rc))
+
+        def on_message(client, userdata, message):
+            callback = self.subscriptions.get(message.topic)
+            if callback is not None:
+                callback(message.payload)
+
+        self.client = mqtt.Client()
+        self.client.on_connect = on_connect
+        self.client.on_message = on_message
+        print("Attempting to connect to broker " + self.broker)
+        self.client.connect(self.broker, self.port)
+        self.client.loop_start()
+
+    def stop(self):
+        if self.client is not None:
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.client = None
+
+class IngestService:
+    """
+    Long-running ingestion pipeline with three stages, each decoupled by a bounded queue:
+    1. receive: the source callback (MQTT network thread) queues raw payloads, blocking when the queue is full
+    2. parse: parser worker threads turn payloads into typed rows
+    3. write: a WeatherDataWriter flushes batched rows with one writer thread (INGEST_WRITERS)
+    Backpressure travels upstream through the blocking queues, stats() reports every stage.
+    After every flush the row count is published on UPDATES_TOPIC so dashboards refresh right away.
+    """
+
+    def __init__(self, source, topic, writer=None, parsers=INGEST_PARSERS, max_queue=INGEST_MAX_QUEUE):
+        self.source = source
+        self.topic = topic
+        self.writer = writer if writer is not None else WeatherDataWriter(workers=INGEST_WRITERS)
+        if self.writer.on_flush is None:
+            self.writer.on_flush = self.announce
+        self.parsers = parsers
+        self._raw = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        self.received = 0
+        self.parsed = 0
+        self.malformed = 0
+        self.started = None
+
+    def on_payload(self, payload):
+        """
+        API for sources to hand over one raw payload, blocks while the parse stage is behind
+        Input: payload (Bytes or String)
+        Output: None
+        """
+        self._raw.put(payload)
+        with self._stats_lock:
+            self.received += 1
+
+    def announce(self, written):
+        """
+        API to tell dashboards that rows were written (see live/events.py)
+        Input: written (Int: rows in the flushed batch)
+        Output: None
+        """
+        self.source.publish(UPDATES_TOPIC, str(written))
+
+    def start(self):
+        """
+        API to start every stage, downstream first so nothing is received before it can be handled
+        Input: None
+        Output: self
+        """
+        self._stop.clear()
+        self.started = time.monotonic()
+        self.writer.start()
+        for index in range(self.parsers):
+            thread = threading.Thread(target=self._parse_loop, name="ingest-parser-{}".format(index), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.source.subscribe(self.topic, self.on_payload)
+        self.source.start()
+        return self
+
+    def stop(self):
+        """
+        API to stop receiving, drain the parse stage and flush the writer
+        Input: None
+        Output: None
+        """
+        self.source.stop()
+        self._raw.join()
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.writer.stop()
+
+    def stats(self):
+        """
+        API to read per-stage queue lengths and counters
+        Input: None
+        Output: Dict
+        """
+        writer = self.writer.stats()
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        with self._stats_lock:
+            return {
+                'receive_queue': self._raw.qsize(),
+                'write_queue': writer['queued'],
+                'received': self.received,
+                'parsed': self.parsed,
+                'malformed': self.malformed,
+                'written': writer['written'],
+                'failed': writer['failed'],
+                'batches': writer['batches'],
+                'written_per_sec': writer['written'] / elapsed if elapsed else 0.0,
+            }
+
+    def run_forever(self, report_interval=INGEST_REPORT_INTERVAL):
+        """
+        API to run the service in the foreground, printing stats every report_interval seconds until interrupted
+        Input: report_interval (Float: seconds)
+        Output: None
+        """
+        self.start()
+        try:
+            while True:
+                time.sleep(report_interval)
+                print("Ingest stats: {}".format(self.stats()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _parse_loop(self):
+        while not self._stop.is_set():
+            try:
+                payload = self._raw.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                row = parse_reading(payload)
+                if row is None:
+                    with self._stats_lock:
+                        self.malformed += 1
+                else:
+                    self.writer.put(row)
+                    with self._stats_lock:
+                        self.parsed += 1
+            finally:
+                self._raw.task_done()
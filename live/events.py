@@ -0,0 +1,101 @@
+# Standard Imports
+import os
+import threading
+import time
+from flask import Response
+
+# Custom Imports
+from db.connection import weather_snapshot
+from db.signal import data_signal
+from ingestion.service import MqttSource, UPDATES_TOPIC
+
+WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", 1.0))
+SSE_HEARTBEAT = float(os.environ.get("SSE_HEARTBEAT", 15))
+SSE_MAX_DURATION = float(os.environ.get("SSE_MAX_DURATION", 300))
+# open streams per worker process, gunicorn.conf.py adds CALLBACK_THREADS on top when sizing the gthread pool
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", 256))
+UPDATES_BROKER = os.environ.get("UPDATES_BROKER")
+
+class SnapshotWatcher:
+    """
+    One background thread per process that keeps the shared snapshot current and so drives data_signal.
+    It refreshes every interval seconds, or right away when data_signal is poked by a local insert or an
+    update notification from the ingestion service. Its database load does not depend on the number of viewers.
+    """
+
+    def __init__(self, refresh=None, interval=WATCH_INTERVAL, signal=data_signal):
+        self.refresh = refresh if refresh is not None else (lambda: weather_snapshot.refresh(force=True))
+        self.interval = interval
+        self.signal = signal
+        self.refreshes = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        API to start the watcher thread once per process
+        Input: None
+        Output: self
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="snapshot-watcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.signal.stale.wait(self.interval)
+            self.signal.stale.clear()
+            self.refresh()
+            self.refreshes += 1
+
+def listenForUpdates(broker=UPDATES_BROKER, topic=UPDATES_TOPIC, signal=data_signal):
+    """
+    API to poke data_signal whenever the ingestion service announces a flush over MQTT
+    Input: broker (String, None to rely on polling only), topic, signal
+    Output: MqttSource or None
+    """
+    if not broker:
+        return None
+    source = MqttSource(broker)
+    source.subscribe(topic, lambda payload: signal.poke())
+    source.start()
+    return source
+
+def registerEvents(server, watcher, path="/events/data", signal=data_signal, max_streams=SSE_MAX_STREAMS):
+    """
+    API to add a Server-Sent Events endpoint that pushes the data version to dashboards
+    The current version is sent on connect and again whenever it changes, comments keep idle
+    connections alive and the stream ends after SSE_MAX_DURATION so the browser reconnects
+    and worker threads are recycled.
+    Every open stream holds a worker thread, at most max_streams are served at once so the threads
+    gunicorn keeps beyond them always serve callbacks. Further viewers get 503 and keep polling.
+    Input: server (Flask app), watcher (SnapshotWatcher started on the first connection), path, signal, max_streams (Int)
+    Output: None
+    """
+    slots = threading.BoundedSemaphore(max_streams)
+
+    def data_events():
+        if not slots.acquire(blocking=False):
+            return Response("too many open streams\n", status=503, mimetype="text/plain", headers={"Retry-After": "60"})
+        watcher.start()
+
+        def stream():
+            yield "retry: 5000\n\n"
+            version = -1
+            deadline = time.monotonic() + SSE_MAX_DURATION
+            while time.monotonic() < deadline:
+                current = signal.wait(version, timeout=min(SSE_HEARTBEAT, max(0.0, deadline - time.monotonic())))
+                if current != version:
+                    version = current
+                    yield "data: {}\n\n".format(version)
+                else:
+                    yield ": keepalive\n\n"
+
+        response = Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        # the server closes the response when the stream ends or the viewer disconnects, even before the first chunk
+        response.call_on_close(slots.release)
+        return response
+
+    server.add_url_rule(path, "data_events", data_events)
@@ -0,0 +1,168 @@
+# Standard Imports
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request
+
+# Custom Imports
+from .flatforest import PREDICT_BATCH
+
+"""
+Batch prediction over HTTP. A request carries readings as JSON (a list of 7-value rows or of objects
+keyed by FEATURE_COLUMNS) or as CSV (with or without a header row), and gets the predicted class and
+class probabilities for every row back in the same format. Bodies above PREDICT_MAX_BYTES or with more
+than PREDICT_MAX_ROWS rows are refused, responses are streamed PREDICT_BATCH rows at a time.
+"""
+PREDICT_MAX_BYTES = int(os.environ.get("PREDICT_MAX_BYTES", 32 * 1024 * 1024))
+PREDICT_MAX_ROWS = int(os.environ.get("PREDICT_MAX_ROWS", 500000))
+FEATURE_COLUMNS = ["temperature", "apparent_temperature", "humidity", "wind_speed", "wind_bearing", "visibility", "pressure"]
+LABELS = ["No Precipitation", "Rainfall", "Snowfall"]
+
+class BadRequest(Exception):
+    """
+    Raised for readings that cannot be parsed, carries the HTTP status to answer with
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def _columns(names, model):
+    """
+    Position of every model feature among the given column names (database or training names)
+    """
+    aliases = [FEATURE_COLUMNS, [str(name) for name in getattr(model, "feature_names_in_", [])]]
+    for expected in aliases:
+        if expected and all(name in names for name in expected):
+            return [names.index(name) for name in expected]
+    raise BadRequest("Readings need the columns {}".format(", ".join(FEATURE_COLUMNS)))
+
+def parseJson(body, model):
+    """
+    API to read readings from a JSON body: a list, or {"readings": list}, of 7-value rows or objects
+    Input: body (Bytes), model (predictor with feature_names_in_)
+    Output: NumPy float64 array of shape (rows, 7)
+    """
+    try:
+        readings = json.loads(body)
+    except ValueError:
+        raise BadRequest("Body is not valid JSON")
+    if isinstance(readings, dict):
+        readings = readings.get("readings")
+    if not isinstance(readings, list):
+        raise BadRequest("Expected a list of readings")
+    if readings and isinstance(readings[0], dict):
+        names = list(readings[0].keys())
+        order = [names[index] for index in _columns(names, model)]
+        try:
+            readings = [[reading[name] for name in order] for reading in readings]
+        except (KeyError, TypeError):
+            raise BadRequest("Every reading needs the same columns")
+    if not readings:
+        return np.empty((0, len(FEATURE_COLUMNS)))
+    try:
+        X = np.array(readings, dtype=np.float64).reshape(len(readings), -1)
+    except (ValueError, TypeError):
+        raise BadRequest("Readings must be numeric rows of equal length")
+    return X
+
+def _isNumber(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+def parseCsv(body, model):
+    """
+    API to read readings from a CSV body, columns are matched by name when the first row is a header
+    Input: body (Bytes), model (predictor with feature_names_in_)
+    Output: NumPy float64 array of shape (rows, 7)
+    """
+    first = body.split(b"\n", 1)[0].decode("utf-8", "replace").split(",")
+    has_header = not all(_isNumber(token) for token in first)
+    try:
+        frame = pd.read_csv(io.BytesIO(body), header=0 if has_header else None)
+    except (ValueError, pd.errors.ParserError):
+        raise BadRequest("Body is not valid CSV")
+    if has_header:
+        names = [str(name).strip() for name in frame.columns]
+        frame = frame.iloc[:, _columns(names, model)]
+    try:
+        return frame.to_numpy(dtype=np.float64)
+    except ValueError:
+        raise BadRequest("Readings must be numeric")
+
+def _jsonStream(model, X):
+    yield '{{"classes": {}, "labels": {}, "predictions": ['.format(json.dumps(model.classes_.tolist()), json.dumps(LABELS))
+    for start in range(0, len(X), PREDICT_BATCH):
+        proba = model.predict_proba(X[start:start + PREDICT_BATCH])
+        predicted = model.classes_.take(np.argmax(proba, axis=1), axis=0).tolist()
+        rows = ('{{"class": {}, "label": {}, "probabilities": {}}}'.format(json.dumps(value), json.dumps(LABELS[value] if 0 <= value < len(LABELS) else str(value)), json.dumps(row))
+                for value, row in zip(predicted, proba.tolist()))
+        yield ("," if start else "") + ",".join(rows)
+    yield "]}"
+
+def _csvStream(model, X):
+    yield "class,label,{}\n".format(",".join("p_{}".format(value) for value in model.classes_.tolist()))
+    for start in range(0, len(X), PREDICT_BATCH):
+        proba = model.predict_proba(X[start:start + PREDICT_BATCH])
+        predicted = model.classes_.take(np.argmax(proba, axis=1), axis=0).tolist()
+        buffer = io.StringIO()
+        for value, row in zip(predicted, proba.tolist()):
+            buffer.write("{},{},{}\n".format(value, LABELS[value] if 0 <= value < len(LABELS) else value, ",".join(repr(p) for p in row)))
+        yield buffer.getvalue()
+
+def registerPredict(server, get_model, path="/api/predict"):
+    """
+    API to add the batch prediction endpoint
+    POST JSON (application/json) or CSV (text/csv) readings, the answer uses the same format
+    Input: server (Flask app), get_model (function returning the current predictor), path
+    Output: None
+    """
+    def predict():
+        if request.content_length is not None and request.content_length > PREDICT_MAX_BYTES:
+            return jsonify(error="Request body larger than {} bytes".format(PREDICT_MAX_BYTES)), 413
+        body = request.stream.read(PREDICT_MAX_BYTES + 1)
+        if len(body) > PREDICT_MAX_BYTES:
+            return jsonify(error="Request body larger than {} bytes".format(PREDICT_MAX_BYTES)), 413
+
+        model = get_model()
+        is_csv = request.mimetype in ("text/csv", "text/plain")
+        try:
+            if is_csv:
+                X = parseCsv(body, model)
+            elif request.mimetype in ("application/json", ""):
+                X = parseJson(body, model)
+            else:
+                raise BadRequest("Send application/json or text/csv", 415)
+            if len(X) > PREDICT_MAX_ROWS:
+                raise BadRequest("More than {} readings".format(PREDICT_MAX_ROWS), 413)
+            if len(X) and X.shape[1] != model.n_features_in_:
+                raise BadRequest("Every reading needs {} values".format(model.n_features_in_))
+            if np.isnan(X).any():
+                raise BadRequest("Readings contain missing values")
+        except BadRequest as err:
+            return jsonify(error=str(err)), err.status
+
+        if is_csv:
+            return Response(_csvStream(model, X), mimetype="text/csv")
+        return Response(_jsonStream(model, X), mimetype="application/json")
+
+    server.add_url_rule(path, "predict", predict, methods=["POST"])
+
+def registerModelStats(server, handle, cache=None, path="/api/model"):
+    """
+    API to add an endpoint reporting the model, memory and prediction cache of the worker that answers
+    Input: server (Flask app), handle (ModelHandle), cache (PredictionCache, optional), path
+    Output: None
+    """
+    def modelStats():
+        stats = handle.stats()
+        if cache is not None:
+            stats['prediction_cache'] = cache.stats()
+        return jsonify(stats)
+
+    server.add_url_rule(path, "model_stats", modelStats)
@@ -0,0 +1,124 @@
+# Standard Imports
+from collections import OrderedDict
+import os
+import threading
+import numpy as np
+
+"""
+The forecast sliders move in fixed steps, so the dashboard only ever asks for a small, repetitive set
+of inputs. Every input is rounded to the step of its slider (SLIDER_STEPS, in FEATURE_COLUMNS order)
+and the prediction for that grid point is kept in a bounded LRU. Entries belong to one version of the
+model file and are dropped as soon as the file is replaced.
+"""
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_PREWARM = int(os.environ.get("PREDICTION_PREWARM", 0))
+PREWARM_READINGS = int(os.environ.get("PREWARM_READINGS", 50000))
+# temperature, apparent temperature, humidity, wind speed, wind bearing, visibility, pressure
+SLIDER_STEPS = (5, 5, 0.05, 1, 30, 1, 5)
+
+def quantize(inputs, steps=SLIDER_STEPS):
+    """
+    API to map readings onto the slider grid
+    Input: inputs (array-like of shape (rows, 7) or one row), steps (step of every feature)
+    Output: NumPy int64 array of grid indexes with the same shape
+    """
+    return np.rint(np.asarray(inputs, dtype=np.float64) / np.asarray(steps)).astype(np.int64)
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions on the slider grid, shared by every client of this process.
+    The model is asked for the grid point itself, so every input rounding to the same key gets the same
+    answer whether or not it was cached.
+    """
+
+    def __init__(self, handle, maxsize=PREDICTION_CACHE_SIZE, steps=SLIDER_STEPS):
+        self.handle = handle
+        self.maxsize = maxsize
+        self.steps = np.asarray(steps, dtype=np.float64)
+        self.signature = None
+        self._predictions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _checkModel(self):
+        """
+        Drop every entry when the model file changed since they were computed, call with the lock held
+        """
+        signature = self.handle.refresh()
+        if signature != self.signature:
+            if self._predictions:
+                self.invalidations += 1
+            self._predictions.clear()
+            self.signature = signature
+
+    def _gridValues(self, keys):
+        # rounded so grid points like 0.15 do not come out as 0.15000000000000002
+        return np.round(np.asarray(keys, dtype=np.float64) * self.steps, 6)
+
+    def predict(self, inputs):
+        """
+        API to predict the class of one reading, from the cache when its grid point was seen before
+        Input: inputs (7 feature values in FEATURE_COLUMNS order)
+        Output: predicted class label
+        """
+        key = tuple(quantize(inputs, self.steps).tolist())
+        with self._lock:
+            self._checkModel()
+            if key in self._predictions:
+                self._predictions.move_to_end(key)
+                self.hits += 1
+                return self._predictions[key]
+            self.misses += 1
+            signature = self.signature
+
+        # Predicted outside the lock so a slow first load does not hold up cached answers
+        prediction = self.handle.get().predict(self._gridValues([key]))[0]
+        with self._lock:
+            if signature == self.signature:
+                self._store(key, prediction)
+        return prediction
+
+    def _store(self, key, prediction):
+        self._predictions[key] = prediction
+        self._predictions.move_to_end(key)
+        while len(self._predictions) > self.maxsize:
+            self._predictions.popitem(last=False)
+
+    def prewarm(self, readings, limit=PREDICTION_PREWARM):
+        """
+        API to fill the cache with the grid points most readings fall on, in one batch prediction
+        Input: readings (array-like of shape (rows, 7), e.g. recent sensor data), limit (number of grid points)
+        Output: Int (grid points added)
+        """
+        if readings is None or limit <= 0:
+            return 0
+        readings = np.asarray(readings, dtype=np.float64).reshape(-1, len(self.steps))
+        if not len(readings):
+            return 0
+        readings = readings[~np.isnan(readings).any(axis=1)]
+        keys, counts = np.unique(quantize(readings, self.steps), axis=0, return_counts=True)
+        keys = keys[np.argsort(-counts, kind="stable")[:min(limit, self.maxsize)]]
+        with self._lock:
+            self._checkModel()
+            signature = self.signature
+        predictions = self.handle.get().predict(self._gridValues(keys)) if len(keys) else []
+        with self._lock:
+            if signature != self.signature:
+                return 0
+            # least common first, so the most common points are the last to be evicted
+            for key, prediction in zip(reversed(keys.tolist()), reversed(list(predictions))):
+                if tuple(key) not in self._predictions:
+                    self._store(tuple(key), prediction)
+        return len(keys)
+
+    def stats(self):
+        """
+        API to read the cache counters
+        Input: None
+        Output: Dict (size, maxsize, hits, misses, invalidations)
+        """
+        with self._lock:
+            return {'size': len(self._predictions), 'maxsize': self.maxsize, 'hits': self.hits,
+                    'misses': self.misses, 'invalidations': self.invalidations}
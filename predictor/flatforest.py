@@ -0,0 +1,304 @@
+# Standard Imports
+import os
+import pickle
+import shutil
+import time
+import numpy as np
+
+"""
+A random forest flattened into contiguous NumPy arrays, evaluated without sklearn.
+Split nodes of every tree are stored back to back (feature, threshold, children = [left, right]),
+a child index >= 0 is another split node and a negative child ~i is leaf i, whose class
+probabilities are a row of leaf_value. sklearn compares float32 inputs against float64 thresholds, so every
+threshold is rounded down to the nearest float32, which keeps each decision (and so every
+prediction) identical at half the size. PREDICT_BATCH rows are evaluated at a time.
+A saved forest is a directory with one .npy file per array, reached through a symlink that every save
+swaps atomically to a new version. Loading memory-maps the arrays read-only, so every process serving
+the same model shares one copy of its pages through the OS page cache.
+"""
+PREDICT_BATCH = int(os.environ.get("PREDICT_BATCH", 4096))
+SAVED_VERSIONS = int(os.environ.get("SAVED_VERSIONS", 3))
+LOAD_ATTEMPTS = 5
+
+def _floorFloat32(values):
+    """
+    Largest float32 that is <= each float64 value
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+def flattenForest(model):
+    """
+    API to flatten a fitted sklearn RandomForestClassifier into node arrays
+    Input: model (RandomForestClassifier)
+    Output: Dict of NumPy arrays (the format saved by saveForest)
+    """
+    features, thresholds, children, values, roots = [], [], [], [], []
+    split_offset, leaf_offset, depth = 0, 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_split = tree.children_left >= 0
+        # position of every node among the split nodes or among the leaves of this tree
+        split_index = np.cumsum(is_split) - 1 + split_offset
+        leaf_index = np.cumsum(~is_split) - 1 + leaf_offset
+        node_ref = np.where(is_split, split_index, ~leaf_index).astype(np.int32)
+
+        features.append(tree.feature[is_split].astype(np.int16))
+        thresholds.append(_floorFloat32(tree.threshold[is_split]))
+        children.append(np.stack([node_ref[tree.children_left[is_split]], node_ref[tree.children_right[is_split]]], axis=1))
+
+        # sklearn >= 1.4 stores class fractions, older versions class counts that predict_proba normalises
+        proba = tree.value[~is_split, 0, :model.n_classes_]
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        if not np.allclose(normalizer, 1.0):
+            normalizer[normalizer == 0.0] = 1.0
+            proba = proba / normalizer
+        values.append(proba)
+
+        roots.append(node_ref[0])
+        split_offset += int(is_split.sum())
+        leaf_offset += int((~is_split).sum())
+        depth = max(depth, tree.max_depth)
+
+    names = getattr(model, "feature_names_in_", None)
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children),
+        'leaf_value': np.concatenate(values),
+        'root': np.array(roots, dtype=np.int32),
+        'classes': np.asarray(model.classes_),
+        'depth': np.array(depth, dtype=np.int32),
+        'n_features': np.array(model.n_features_in_, dtype=np.int32),
+        'feature_names': np.asarray(names if names is not None else [], dtype=str),
+    }
+
+def _treeRanges(arrays):
+    """
+    Split node and leaf ranges [start, end) of every tree, the trees are stored back to back
+    """
+    roots, children = arrays['root'], arrays['children']
+    splits, leaves = [], []
+    split_start = leaf_start = 0
+    for index, root in enumerate(roots):
+        if root < 0:
+            split_end = split_start
+            leaf_count = 1
+        else:
+            following = roots[index + 1:]
+            following = following[following >= 0]
+            split_end = int(following[0]) if len(following) else len(children)
+            leaf_count = int((children[split_start:split_end] < 0).sum())
+        splits.append((split_start, split_end))
+        leaves.append((leaf_start, leaf_start + leaf_count))
+        split_start, leaf_start = split_end, leaf_start + leaf_count
+    return splits, leaves
+
+def mergeForests(old, new, max_trees=None):
+    """
+    API to add the trees of one flattened forest to another, keeping the newest max_trees
+    The class columns are aligned on the union of both class lists, a class a forest never saw gets probability 0
+    Input: old, new (Dicts from flattenForest, the same features), max_trees (Int, None to keep every tree)
+    Output: Dict of NumPy arrays (the format saved by saveForest)
+    """
+    if int(old['n_features'].item()) != int(new['n_features'].item()):
+        raise ValueError("Forests over {} and {} features cannot be merged".format(int(old['n_features'].item()), int(new['n_features'].item())))
+    classes = np.union1d(old['classes'], new['classes'])
+    total = len(old['root']) + len(new['root'])
+    drop = 0 if max_trees is None else max(0, min(len(old['root']), total - max_trees))
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    split_offset = leaf_offset = 0
+    for arrays, first in ((old, drop), (new, 0)):
+        splits, leaves = _treeRanges(arrays)
+        if first >= len(splits):
+            continue
+        split_lo, split_hi = splits[first][0], splits[-1][1]
+        leaf_lo, leaf_hi = leaves[first][0], leaves[-1][1]
+        # split references move by the split shift, leaf references (~leaf) by the leaf shift
+        split_shift, leaf_shift = split_offset - split_lo, leaf_offset - leaf_lo
+        kept = arrays['children'][split_lo:split_hi]
+        children.append(np.where(kept >= 0, kept + split_shift, kept - leaf_shift).astype(np.int32))
+        root = arrays['root'][first:]
+        roots.append(np.where(root >= 0, root + split_shift, root - leaf_shift).astype(np.int32))
+        features.append(arrays['feature'][split_lo:split_hi])
+        thresholds.append(arrays['threshold'][split_lo:split_hi])
+        value = np.zeros((leaf_hi - leaf_lo, len(classes)))
+        value[:, np.searchsorted(classes, arrays['classes'])] = arrays['leaf_value'][leaf_lo:leaf_hi]
+        values.append(value)
+        split_offset += split_hi - split_lo
+        leaf_offset += leaf_hi - leaf_lo
+
+    merged = dict(old)
+    merged.update({
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children),
+        'leaf_value': np.concatenate(values),
+        'root': np.concatenate(roots),
+        'classes': classes,
+        # a loop bound for FlatForest, the deepest tree of either forest is always enough
+        'depth': np.array(max(int(old['depth'].item()), int(new['depth'].item())), dtype=np.int32),
+    })
+    return merged
+
+def _versions(path):
+    """
+    Version directories written for path, oldest first
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    prefix = name + ".v"
+    return sorted(os.path.join(directory, entry) for entry in os.listdir(directory) if entry.startswith(prefix))
+
+def saveForest(arrays, path, keep=SAVED_VERSIONS):
+    """
+    API to write flattened forest arrays to a directory of .npy files
+    Every save writes a new version directory next to path (path.v<time>) and then atomically points
+    the path symlink at it, so path always names a complete model and readers never see half a
+    model. The newest keep versions stay on disk for readers still loading an older one.
+    A path that is still a plain directory (written before versions) is moved aside on the first save.
+    Input: arrays (Dict from flattenForest), path (String: symlink to the current version), keep (Int)
+    Output: String (the version directory written)
+    """
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    version = "{}.v{:020d}-{}".format(path, time.time_ns(), os.getpid())
+    staging = version + ".tmp"
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, name + ".npy"), np.ascontiguousarray(array))
+    os.rename(staging, version)
+
+    if os.path.isdir(path) and not os.path.islink(path):
+        os.rename(path, "{}.v{:020d}-{}".format(path, 0, os.getpid()))
+    link = "{}.link-{}".format(path, os.getpid())
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, path)
+
+    current = os.path.realpath(path)
+    for old in _versions(path)[:-keep]:
+        if old != current and not old.endswith(".tmp"):
+            shutil.rmtree(old, ignore_errors=True)
+    return version
+
+class FlatForest:
+    """
+    Predictor over flattened forest arrays, a drop-in for RandomForestClassifier.predict/predict_proba.
+    Every tree walks all rows of a batch at once, one vectorized step per tree level.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children'].ravel()
+        self.leaf_value = arrays['leaf_value']
+        self.root = arrays['root']
+        self.classes_ = arrays['classes']
+        self.depth = int(arrays['depth'].item())
+        self.n_features_in_ = int(arrays['n_features'].item())
+        self.feature_names_in_ = arrays['feature_names']
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        API to load a forest written by saveForest
+        Input: path (String: symlink or directory), mmap (Bool: map the arrays read-only instead of reading them)
+        Output: FlatForest
+        """
+        for attempt in range(LOAD_ATTEMPTS):
+            # resolved once, so a save swapping the symlink meanwhile cannot mix two versions
+            version = os.path.realpath(path)
+            try:
+                arrays = {}
+                for filename in sorted(os.listdir(version)):
+                    if filename.endswith(".npy"):
+                        arrays[filename[:-4]] = np.load(os.path.join(version, filename), mmap_mode="r" if mmap else None)
+                return cls(arrays)
+            except FileNotFoundError:
+                # that version was retired by later saves while loading, resolve the link again
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def _leaves(self, X):
+        """
+        Leaf reached by every row in every tree, shape (trees, rows)
+        All (tree, row) pairs step down one level per iteration, pairs that reached a leaf drop out
+        """
+        rows = len(X)
+        flat_X = X.ravel()
+        node = np.repeat(self.root, rows)
+        offset = np.tile(np.arange(rows, dtype=np.int32) * self.n_features_in_, len(self.root))
+        active = np.flatnonzero(node >= 0).astype(np.int32)
+        for _ in range(self.depth):
+            if not len(active):
+                break
+            current = node[active]
+            # x <= threshold goes left (children[2n]), otherwise right (children[2n + 1])
+            go_right = flat_X[offset[active] + self.feature[current]] > self.threshold[current]
+            step = self.children[2 * current + go_right]
+            node[active] = step
+            active = active[step >= 0]
+        return ~node.reshape(len(self.root), rows)
+
+    def predict_proba(self, X):
+        """
+        API to compute class probabilities, the mean of the tree probabilities like sklearn
+        Input: X (array-like of shape (rows, n_features))
+        Output: NumPy float64 array of shape (rows, classes)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError("X has {} features, the model expects {}".format(X.shape[-1], self.n_features_in_))
+        if np.isnan(X).any():
+            raise ValueError("Input X contains NaN.")
+        proba = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), PREDICT_BATCH):
+            leaves = self._leaves(X[start:start + PREDICT_BATCH])
+            total = self.leaf_value[leaves[0]].copy()
+            # summed tree by tree in order, as sklearn accumulates them
+            for tree in range(1, len(leaves)):
+                total += self.leaf_value[leaves[tree]]
+            proba[start:start + len(total)] = total / len(self.root)
+        return proba
+
+    def predict(self, X):
+        """
+        API to predict class labels
+        Input: X (array-like of shape (rows, n_features))
+        Output: NumPy array of labels
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def verifyForest(model, forest, X):
+    """
+    API to check that a FlatForest reproduces the sklearn model exactly
+    sklearn adds up the trees in whatever order its threads finish, so the reference runs on one thread
+    to make its probabilities reproducible to the last bit
+    Input: model (RandomForestClassifier), forest (FlatForest), X (rows to compare on)
+    Output: Bool (identical predictions and probabilities)
+    """
+    n_jobs, model.n_jobs = model.n_jobs, 1
+    try:
+        return bool(np.array_equal(model.predict(X), forest.predict(X)) and np.array_equal(model.predict_proba(X), forest.predict_proba(X)))
+    finally:
+        model.n_jobs = n_jobs
+
+def loadForest(flat_path, pickle_path=None):
+    """
+    API to load the predictor, from the flattened file or else by flattening the pickled sklearn model
+    Input: flat_path (String: directory from saveForest), pickle_path (String: pickled RandomForestClassifier, optional)
+    Output: FlatForest
+    """
+    if os.path.exists(flat_path) or pickle_path is None:
+        return FlatForest.load(flat_path)
+    with open(pickle_path, "rb") as readFile:
+        return FlatForest(flattenForest(pickle.load(readFile)))
@@ -0,0 +1,131 @@
+# Standard Imports
+import os
+import resource
+import threading
+import time
+
+# Custom Imports
+from .flatforest import loadForest
+
+def processMemory():
+    """
+    API to read the memory of this process: resident, shared with other processes and proportional
+    (resident set with shared pages split between the processes mapping them)
+    Falls back to the peak resident size where /proc is not available
+    Input: None
+    Output: Dict of bytes (rss, shared, pss, peak_rss)
+    """
+    usage = {'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    try:
+        with open("/proc/self/smaps_rollup") as readFile:
+            for line in readFile:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty"):
+                    usage[name.lower()] = int(value.split()[0]) * 1024
+        usage['shared'] = usage.pop('shared_clean', 0) + usage.pop('shared_dirty', 0)
+    except OSError:
+        pass
+    return usage
+
+class ModelHandle:
+    """
+    Lazily loaded prediction model shared by the callbacks of one process.
+    Nothing is read at import, so workers start quickly, the first get() loads (memory-maps) the model.
+    refresh() notices a replaced model file and has the next get() load the new one.
+    """
+
+    def __init__(self, flat_path, pickle_path=None):
+        self.flat_path = flat_path
+        self.pickle_path = pickle_path
+        self.model = None
+        self.load_seconds = None
+        self.signature = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        API to return the model, loading it on first use
+        Input: None
+        Output: FlatForest
+        """
+        model = self.model
+        if model is None:
+            with self._lock:
+                if self.model is None:
+                    start = time.perf_counter()
+                    self.signature = self.fileSignature()
+                    self.model = loadForest(self.flat_path, self.pickle_path)
+                    self.load_seconds = time.perf_counter() - start
+                model = self.model
+        return model
+
+    def latest(self):
+        """
+        API to return the model, loading it again first when the model file was replaced
+        Input: None
+        Output: FlatForest
+        """
+        self.refresh()
+        return self.get()
+
+    def fileSignature(self):
+        """
+        API to identify the current model file, a new file (or a rewritten one) gives a new signature
+        Input: None
+        Output: Tuple (path, inode, modification time in ns), the flattened model's version directory
+                behind the symlink when there is one, None when there is no model file
+        """
+        for path in (self.flat_path, self.pickle_path):
+            if not path:
+                continue
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            return (os.path.realpath(path), info.st_ino, info.st_mtime_ns)
+        return None
+
+    def flattened(self, signature):
+        """
+        API to tell whether a signature names the flattened model rather than the pickle
+        Input: signature (see fileSignature)
+        Output: Bool
+        """
+        return signature is not None and (not self.pickle_path or signature[0] != os.path.realpath(self.pickle_path))
+
+    def refresh(self):
+        """
+        API to check the model file, a loaded model that is out of date is released and loaded again on the next get()
+        Input: None
+        Output: signature of the current model file (see fileSignature)
+        """
+        signature = self.fileSignature()
+        if self.flattened(self.signature) and not self.flattened(signature):
+            # the flattened model went missing, keep serving it rather than fall back to the older pickle
+            return self.signature
+        if self.model is not None and signature != self.signature:
+            with self._lock:
+                if self.model is not None and signature != self.signature:
+                    self.model = None
+        return signature
+
+    def stats(self):
+        """
+        API to describe the model and the memory of this process
+        Input: None
+        Output: Dict
+        """
+        model = self.model
+        stats = {
+            'pid': os.getpid(),
+            'loaded': model is not None,
+            'load_seconds': self.load_seconds,
+            'memory': processMemory(),
+        }
+        if model is not None:
+            stats['model_bytes'] = model.nbytes
+            stats['memory_mapped'] = all(getattr(array, "filename", None) is not None for array in model.arrays.values())
+            stats['trees'] = len(model.root)
+            if 'trained_id' in model.arrays:
+                stats['trained_id'] = int(model.arrays['trained_id'].item())
+        return stats
@@ -0,0 +1,172 @@
+# Standard Imports
+import argparse
+import fcntl
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Custom Imports
+from db.connection import get_weatherData_extent
+from .flatforest import FlatForest, flattenForest, mergeForests, saveForest
+from .training import HOLDOUT_EVERY, RSEED, loadTrainingData, scoreModel, trainForest
+
+"""
+Background retraining. The flattened model records the last reading id it was trained on (trained_id),
+once RETRAIN_MIN_ROWS newer readings arrived a round fits RETRAIN_TREES new trees on the latest
+RETRAIN_WINDOW readings only, adds them to the served forest, keeps the newest RETRAIN_MAX_TREES trees
+and writes the result with saveForest, which atomically points the model symlink at it. Every process serving the model
+notices the new version through ModelHandle.refresh() and maps it on its next prediction, nothing
+restarts. Rounds are scored on the recent readings of the fixed test slice (ids divisible by
+HOLDOUT_EVERY), which neither dataTraining nor any round trains on, and a round whose forest scores
+clearly worse than the current one is not installed.
+Only one process runs a round at a time (a lock file next to the model), so every gunicorn worker can
+start the job. A round that is not installed leaves trained_id as it was and records the last id it
+read next to the model (.rejected), the next round waits for RETRAIN_MIN_ROWS readings beyond that.
+"""
+RETRAIN_INTERVAL = float(os.environ.get("RETRAIN_INTERVAL", 0))
+RETRAIN_MIN_ROWS = int(os.environ.get("RETRAIN_MIN_ROWS", 5000))
+RETRAIN_WINDOW = int(os.environ.get("RETRAIN_WINDOW", 200000))
+RETRAIN_TREES = int(os.environ.get("RETRAIN_TREES", 10))
+RETRAIN_MAX_TREES = int(os.environ.get("RETRAIN_MAX_TREES", 200))
+RETRAIN_F1_TOLERANCE = float(os.environ.get("RETRAIN_F1_TOLERANCE", 0.01))
+
+def trainedId(arrays):
+    """
+    API to read the last reading id a flattened forest was trained on
+    Input: arrays (Dict from flattenForest or FlatForest.arrays)
+    Output: Int, 0 when the forest does not record it
+    """
+    return int(arrays['trained_id'].item()) if 'trained_id' in arrays else 0
+
+class RetrainJob:
+    """
+    Adds trees trained on newly ingested readings to the flattened model on disk.
+    runOnce() does one round when enough readings arrived, start() repeats it every interval seconds
+    on a daemon thread.
+    """
+
+    def __init__(self, flat_path, interval=RETRAIN_INTERVAL, min_rows=RETRAIN_MIN_ROWS, window=RETRAIN_WINDOW,
+                 trees=RETRAIN_TREES, max_trees=RETRAIN_MAX_TREES, f1_tolerance=RETRAIN_F1_TOLERANCE):
+        self.flat_path = flat_path
+        self.interval = interval
+        self.min_rows = min_rows
+        self.window = window
+        self.trees = trees
+        self.max_trees = max_trees
+        self.f1_tolerance = f1_tolerance
+        self.rounds = 0
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def rejectedId(self):
+        """
+        API to read the last id read by a round that was not installed
+        Input: None
+        Output: Int, 0 when no round was rejected
+        """
+        try:
+            with open(self.flat_path + ".rejected") as readFile:
+                return int(readFile.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def pending(self):
+        """
+        API to count the readings that arrived after the served model was trained, or after the last
+        rejected round when that is later
+        Input: None
+        Output: Tuple (new readings, trained_id, max id)
+        """
+        current = FlatForest.load(self.flat_path)
+        trained_id = trainedId(current.arrays)
+        max_id = get_weatherData_extent()[1]
+        return max(0, max_id - max(trained_id, self.rejectedId())), trained_id, max_id
+
+    def runOnce(self):
+        """
+        API to run one retraining round if enough readings arrived and no other process is running one
+        Input: None
+        Output: Dict describing the round, None when there was nothing to do
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.flat_path)), exist_ok=True)
+        with open(self.flat_path + ".lock", "w") as lockFile:
+            try:
+                fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            # read under the lock, another process may have just installed a round
+            new_rows, trained_id, max_id = self.pending()
+            if new_rows < self.min_rows:
+                return None
+            return self._round(trained_id, max_id)
+
+    def _round(self, trained_id, max_id):
+        start = time.perf_counter()
+        seed = (RSEED + max_id) % 2**32
+        current = FlatForest.load(self.flat_path)
+        depth = int(current.arrays['depth'].item())
+        X_train, y_train, X_test, y_test, info = loadTrainingData(self.window, seed=seed, after_id=max(0, max_id - self.window),
+                                                                  holdout_every=HOLDOUT_EVERY)
+        result = {'trained_id': trained_id, 'max_id': info['max_id'], 'train_rows': len(X_train), 'test_rows': len(X_test)}
+        if not len(X_train):
+            return result
+
+        # one thread, the job shares the machine with the dashboard
+        rf = trainForest(X_train, y_train, n_estimators=self.trees, max_depth=depth, n_jobs=1, seed=seed)
+        merged = mergeForests(current.arrays, flattenForest(rf), self.max_trees)
+        merged['trained_id'] = np.array(info['max_id'], dtype=np.int64)
+        candidate = FlatForest(merged)
+
+        result['f1_before'] = scoreModel(current, X_test, y_test)['f1'] if len(X_test) else None
+        result['f1_after'] = scoreModel(candidate, X_test, y_test)['f1'] if len(X_test) else None
+        result['trees'] = len(candidate.root)
+        result['installed'] = bool(result['f1_before'] is None or result['f1_after'] >= result['f1_before'] - self.f1_tolerance)
+        if result['installed']:
+            saveForest(merged, self.flat_path)
+        else:
+            with open(self.flat_path + ".rejected", "w") as writeFile:
+                writeFile.write(str(info['max_id']))
+        result['seconds'] = time.perf_counter() - start
+        self.rounds += 1
+        self.last_result = result
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                result = self.runOnce()
+            except Exception as err:
+                print("Retraining failed: {}".format(err))
+                continue
+            if result is not None:
+                print("Retraining: {}".format(json.dumps(result)))
+
+    def start(self):
+        """
+        API to retrain in the background every interval seconds
+        Input: None
+        Output: None
+        """
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="model-retrain", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add trees trained on new readings to the served model")
+    parser.add_argument("--model", default="model/weathermodel.flat")
+    parser.add_argument("--interval", type=float, default=RETRAIN_INTERVAL or 600)
+    parser.add_argument("--once", action="store_true", help="run one round now and exit")
+    args = parser.parse_args()
+
+    job = RetrainJob(args.model, args.interval)
+    if args.once:
+        print(json.dumps(job.runOnce()))
+    else:
+        job.start()
+        job._thread.join()
@@ -0,0 +1,159 @@
+# Standard Imports
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+from sklearn.metrics import f1_score
+
+# Custom Imports
+from .flatforest import FlatForest, flattenForest, saveForest
+from .training import RSEED, rowLatency, trainForest
+
+"""
+Hyperparameter search for the precipitation forest. Candidates are fitted on a process pool, one
+single-threaded fit per worker, until SEARCH_SECONDS of wall time have passed; fits still running then
+are abandoned. The training and validation arrays are written once as .npy files (under /dev/shm when
+it exists) and every worker memory-maps them, so the pool shares one copy of the matrix.
+Every candidate is scored as it would ship: flattened, with its weighted F1 on the validation rows, its
+evaluation time per row and its size in bytes. Workers fit, score F1 and save the flattened model, the
+evaluation time is measured afterwards in this process, one model at a time with the pool gone, so
+fits running on the other cores do not show up in it (best of LATENCY_REPEAT runs). Models that no other
+model beats on all three form the frontier the shipped model is picked from.
+"""
+SEARCH_SECONDS = float(os.environ.get("SEARCH_SECONDS", 600))
+LATENCY_REPEAT = 3
+SEARCH_SPACE = {
+    'n_estimators': [10, 25, 50, 100],
+    'max_depth': [8, 10, 12, 16],
+    'max_samples': [0.1, 0.3, None],
+    'min_samples_leaf': [1, 5, 20],
+}
+_shared = {}
+
+def candidates(space=SEARCH_SPACE, seed=RSEED):
+    """
+    API to list the configurations of a search space, cheapest first so a short budget still covers many
+    Input: space (Dict of parameter name to values), seed (shuffles configurations of equal cost)
+    Output: List of Dicts
+    """
+    names = sorted(space)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    random.Random(seed).shuffle(configs)
+
+    def cost(config):
+        share = config.get('max_samples') or 1.0
+        return config.get('n_estimators', 100) * share * (config.get('max_depth') or 32)
+
+    return sorted(configs, key=cost)
+
+def _attach(directory, models):
+    """
+    Pool initializer: map the shared arrays read-only, once per worker
+    """
+    for name in ('X_train', 'y_train', 'X_val', 'y_val'):
+        _shared[name] = np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+    _shared['models'] = models
+
+def evaluate(config, seed=RSEED, index=0):
+    """
+    API to fit one candidate on the shared arrays, score its F1 as it would ship and save it flattened for timing
+    Input: config (Dict of RandomForestClassifier parameters), seed, index (Int: names the saved model)
+    Output: Dict (config, f1, model_bytes, fit_seconds, path of the saved model)
+    """
+    start = time.perf_counter()
+    rf = trainForest(_shared['X_train'], _shared['y_train'], n_jobs=1, seed=seed, **config)
+    fit_seconds = time.perf_counter() - start
+    arrays = flattenForest(rf)
+    del rf
+    forest = FlatForest(arrays)
+
+    X_val, y_val = _shared['X_val'], _shared['y_val']
+    f1 = f1_score(y_val, forest.predict(X_val), average='weighted', zero_division=0)
+    path = os.path.join(_shared['models'], "candidate-{}".format(index))
+    saveForest(arrays, path)
+    return {'config': config, 'f1': f1, 'model_bytes': forest.nbytes, 'fit_seconds': fit_seconds, 'path': path}
+
+def timeLatency(path, X_val, repeat=LATENCY_REPEAT):
+    """
+    API to time a saved candidate on an otherwise idle process
+    Input: path (String: saved model), X_val (readings), repeat (Int: runs, the fastest counts)
+    Output: Float microseconds per row
+    """
+    forest = FlatForest.load(path, mmap=False)
+    return min(rowLatency(forest, X_val) for _ in range(repeat)) * 1e6
+
+def paretoFrontier(results):
+    """
+    API to keep the results no other result matches or beats on F1, latency and size while beating it on one
+    Input: results (List of Dicts from evaluate)
+    Output: List of Dicts, best F1 first
+    """
+    def dominates(a, b):
+        no_worse = a['f1'] >= b['f1'] and a['latency_us'] <= b['latency_us'] and a['model_bytes'] <= b['model_bytes']
+        better = a['f1'] > b['f1'] or a['latency_us'] < b['latency_us'] or a['model_bytes'] < b['model_bytes']
+        return no_worse and better
+
+    frontier = [result for result in results if not any(dominates(other, result) for other in results)]
+    return sorted(frontier, key=lambda result: (-result['f1'], result['latency_us']))
+
+def pickModel(frontier, f1_tolerance=0.005):
+    """
+    API to choose the shipped model: the fastest, then smallest, within f1_tolerance of the best F1
+    Input: frontier (List of Dicts from paretoFrontier), f1_tolerance (Float)
+    Output: Dict (one result), None for an empty frontier
+    """
+    if not frontier:
+        return None
+    best = max(result['f1'] for result in frontier)
+    close = [result for result in frontier if result['f1'] >= best - f1_tolerance]
+    return min(close, key=lambda result: (result['latency_us'], result['model_bytes']))
+
+def search(X_train, y_train, X_val, y_val, configs, seconds=SEARCH_SECONDS, workers=None, seed=RSEED, report=None):
+    """
+    API to evaluate configs on a process pool until they are done or seconds have passed
+    Input: X_train, y_train, X_val, y_val (NumPy arrays), configs (List of Dicts), seconds (wall time budget),
+           workers (Int: processes, None for every CPU), seed, report (function called with every result)
+    Output: Dict (results List, frontier List, evaluated, failed, abandoned, seconds)
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    shared_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    directory = tempfile.mkdtemp(prefix="weathersearch-", dir=shared_root)
+    models = tempfile.mkdtemp(prefix="weathersearch-models-")
+    start = time.perf_counter()
+    fitted, errors = [], []
+    try:
+        for name, array in (('X_train', X_train), ('y_train', y_train), ('X_val', X_val), ('y_val', y_val)):
+            np.save(os.path.join(directory, name + ".npy"), np.ascontiguousarray(array))
+
+        pool = multiprocessing.Pool(workers, initializer=_attach, initargs=(directory, models))
+        try:
+            pending = [pool.apply_async(evaluate, (config, seed, index), callback=fitted.append, error_callback=errors.append)
+                       for index, config in enumerate(configs)]
+            deadline = start + seconds
+            for job in pending:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                job.wait(remaining)
+        finally:
+            # fits still running past the budget are abandoned with their workers
+            pool.terminate()
+            pool.join()
+
+        results = []
+        for result in list(fitted):
+            path = result.pop('path')
+            result['latency_us'] = timeLatency(path, X_val)
+            results.append(result)
+            if report is not None:
+                report(result)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        shutil.rmtree(models, ignore_errors=True)
+
+    return {'results': results, 'frontier': paretoFrontier(results), 'evaluated': len(results), 'failed': len(errors),
+            'abandoned': len(configs) - len(results) - len(errors), 'seconds': time.perf_counter() - start}
@@ -0,0 +1,184 @@
+# Standard Imports
+import math
+import os
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+# Custom Imports
+from db.connection import get_weatherData_chunks, get_weatherData_extent
+from .api import FEATURE_COLUMNS
+from .loader import processMemory
+
+"""
+Training within a memory budget. The table is streamed in TRAIN_CHUNK row pages straight into one
+preallocated float32 feature matrix and int8 label vector (ROW_BYTES per reading), the training rows
+fill it from the front and the test rows from the back, so splitting copies nothing. float32 is the
+type sklearn trees split on, so fitting does not copy the matrix either.
+planTraining sizes the sample and the number of parallel tree builders so that the matrix, the
+per-thread working arrays of sklearn and the grown trees fit the budget together, max_samples (the
+subsampled bootstrap) shrinks what every tree builder needs.
+"""
+TRAIN_MEMORY_MB = int(os.environ.get("TRAIN_MEMORY_MB", 8192))
+TRAIN_CHUNK = int(os.environ.get("TRAIN_CHUNK", 50000))
+RSEED = 12345
+# readings whose id is a multiple of HOLDOUT_EVERY are the fixed test slice, never trained on by dataTraining or retraining
+HOLDOUT_EVERY = int(os.environ.get("HOLDOUT_EVERY", 5))
+# precip_type encoded like LabelEncoder did (sorted), so 0, 1, 2 match predictor.api.LABELS
+PRECIP_CLASSES = ("none", "rain", "snow")
+ROW_BYTES = 4 * len(FEATURE_COLUMNS) + 1
+# sklearn per training row: labels as float64, and per tree builder the bootstrap weights
+# (float64 ones and counts) plus, per drawn row, the sample index and the sorted feature value
+FIT_ROW_BYTES = 8
+BUILDER_ROW_BYTES = 16
+BUILDER_DRAWN_BYTES = 12
+# one sklearn tree node with its class values
+NODE_BYTES = 64 + 8 * len(PRECIP_CLASSES)
+VERIFY_ROWS = 20000
+LATENCY_ROWS = 20000
+
+def _drawnFraction(max_samples, rows):
+    """
+    Expected share of the training rows a bootstrap of max_samples draws at least once
+    """
+    if max_samples is None:
+        draws = 1.0
+    elif isinstance(max_samples, float):
+        draws = max_samples
+    else:
+        draws = min(1.0, max_samples / max(rows, 1))
+    return 1.0 - math.exp(-draws)
+
+def modelBytes(rows, n_estimators, max_depth, max_samples=None):
+    """
+    API to bound the memory of the grown forest
+    Input: rows (Int: training rows), n_estimators, max_depth (Int or None), max_samples (Float share, Int rows or None)
+    Output: Int bytes
+    """
+    drawn = max(1, int(rows * _drawnFraction(max_samples, rows)))
+    nodes = 2 * drawn - 1 if max_depth is None else min(2 ** (max_depth + 1) - 1, 2 * drawn - 1)
+    return n_estimators * nodes * NODE_BYTES
+
+def planTraining(budget_bytes, available_rows, n_estimators, max_depth, max_samples=None, n_jobs=None, test_size=0.3):
+    """
+    API to choose how many readings to load and how many trees to build in parallel within a budget
+    Keeps every reading when it can, dropping parallel tree builders first and sampling readings last
+    Input: budget_bytes (Int: for the whole process), available_rows (Int), n_estimators, max_depth,
+           max_samples, n_jobs (Int: most tree builders, None for every CPU), test_size (share held out)
+    Output: Dict (rows, n_jobs, budget, reserved bytes)
+    """
+    # what is already resident (interpreter, NumPy, sklearn) is not available to training
+    memory = processMemory()
+    reserved = memory.get('rss', memory['peak_rss'])
+    most_jobs = max(1, n_jobs or os.cpu_count() or 1)
+
+    def rowsFor(jobs):
+        # the forest is bounded for all readings, it only shrinks with fewer
+        free = budget_bytes - reserved - modelBytes(int(available_rows * (1 - test_size)), n_estimators, max_depth, max_samples)
+        per_row = ROW_BYTES + (1 - test_size) * (FIT_ROW_BYTES + jobs * (BUILDER_ROW_BYTES + BUILDER_DRAWN_BYTES * _drawnFraction(max_samples, available_rows)))
+        return max(0, min(available_rows, int(free / per_row)))
+
+    jobs = most_jobs
+    while jobs > 1 and rowsFor(jobs) < available_rows:
+        jobs -= 1
+    rows = rowsFor(jobs)
+    if rows == 0 and available_rows:
+        raise MemoryError("A {} MB budget leaves no room for training data ({} MB already in use)".format(budget_bytes // 2**20, reserved // 2**20))
+    return {'rows': rows, 'n_jobs': jobs, 'budget': budget_bytes, 'reserved': reserved}
+
+def _encodeLabels(values):
+    codes = {name: code for code, name in enumerate(PRECIP_CLASSES)}
+    # no precipitation is stored as NULL, "" by generateData.py and the ingestion parser, "null" by the CSV import
+    for missing in (None, "", "null"):
+        codes[missing] = codes["none"]
+    return np.fromiter((codes.get(value, -1) for value in values), dtype=np.int8, count=len(values))
+
+def loadTrainingData(rows, test_size=0.3, seed=RSEED, chunk_size=TRAIN_CHUNK, after_id=None, holdout_every=None):
+    """
+    API to stream readings into a float32 training and test split holding at most rows readings
+    When the table has more, every reading is kept with the same probability, so the sample is uniform
+    Readings with missing features or an unknown precip_type are skipped
+    Input: rows (Int: capacity), test_size (share held out at random), seed, chunk_size (Int: rows per query),
+           after_id (Int: only readings with a higher id, None for the whole table),
+           holdout_every (Int: hold out the readings whose id is a multiple of it instead of test_size, see HOLDOUT_EVERY)
+    Output: Tuple (X_train, y_train, X_test, y_test, info Dict with max_id, the last id that was read)
+    """
+    count, max_id = get_weatherData_extent()
+    if after_id is not None:
+        # ids are unique, so the id range bounds the readings in it
+        count = max(0, min(count, max_id - after_id))
+    capacity = min(rows, count)
+    X = np.empty((capacity, len(FEATURE_COLUMNS)), dtype=np.float32)
+    y = np.empty(capacity, dtype=np.int8)
+    front, back = 0, capacity
+    keep_share = capacity / count if count else 0.0
+    rng = np.random.default_rng(seed)
+    read = skipped = 0
+
+    for chunk in get_weatherData_chunks(['precip_type'] + FEATURE_COLUMNS, chunk_size, max_id, after_id):
+        if front >= back:
+            break
+        columns = list(zip(*chunk))
+        features = np.array(columns[2:], dtype=np.float32).T
+        labels = _encodeLabels(columns[1])
+        valid = (labels >= 0) & ~np.isnan(features).any(axis=1)
+        read += len(chunk)
+        skipped += int((~valid).sum())
+        if keep_share < 1.0:
+            valid &= rng.random(len(chunk)) < keep_share
+        if holdout_every:
+            held_out = np.array(columns[0], dtype=np.int64) % holdout_every == 0
+        else:
+            held_out = rng.random(len(chunk)) < test_size
+
+        train = np.flatnonzero(valid & ~held_out)[:back - front]
+        X[front:front + len(train)], y[front:front + len(train)] = features[train], labels[train]
+        front += len(train)
+        test = np.flatnonzero(valid & held_out)[:back - front]
+        X[back - len(test):back], y[back - len(test):back] = features[test], labels[test]
+        back -= len(test)
+
+    info = {'table_rows': count, 'max_id': max_id, 'rows_read': read, 'rows_skipped': skipped, 'train_rows': front,
+            'test_rows': capacity - back, 'matrix_bytes': X.nbytes + y.nbytes}
+    return X[:front], y[:front], X[back:], y[back:], info
+
+def trainForest(X, y, n_estimators=100, max_depth=16, max_samples=None, min_samples_leaf=1, n_jobs=1, seed=RSEED):
+    """
+    API to fit the precipitation forest on float32 training data
+    Input: X (float32 array of FEATURE_COLUMNS), y (int8 labels), n_estimators, max_depth,
+           max_samples (Float share or Int rows drawn per tree, None for a full bootstrap), min_samples_leaf, n_jobs, seed
+    Output: RandomForestClassifier
+    """
+    rf = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, max_samples=max_samples,
+                                min_samples_leaf=min_samples_leaf, random_state=seed, n_jobs=n_jobs)
+    rf.fit(X, y)
+    return rf
+
+def scoreModel(model, X, y):
+    """
+    API to compute the reported metrics (weighted over the classes)
+    Input: model (predictor), X, y (held out readings and labels)
+    Output: Dict (accuracy, recall, precision, f1)
+    """
+    y_pred = model.predict(X)
+    return {
+        'accuracy': accuracy_score(y, y_pred),
+        'recall': recall_score(y, y_pred, average='weighted', zero_division=0),
+        'precision': precision_score(y, y_pred, average='weighted', zero_division=0),
+        'f1': f1_score(y, y_pred, average='weighted', zero_division=0),
+    }
+
+def rowLatency(model, X, rows=LATENCY_ROWS):
+    """
+    API to time batch prediction, the evaluation cost of one reading
+    Input: model (predictor), X (readings, the first rows are timed), rows (Int)
+    Output: Float seconds per row
+    """
+    sample = np.ascontiguousarray(X[:rows])
+    if not len(sample):
+        return 0.0
+    model.predict(sample[:1])
+    start = time.perf_counter()
+    model.predict(sample)
+    return (time.perf_counter() - start) / len(sample)
@@ -0,0 +1,19 @@
+# Standard Imports
+import numpy as np
+
+# Custom Imports
+from predictor import training
+from predictor.api import FEATURE_COLUMNS
+
+def test_missing_precip_type_is_no_precipitation(monkeypatch):
+    precip_types = ["", "null", None, "rain", "snow", "hail"]
+    rows = [(id, precip_type) + (1.0,) * len(FEATURE_COLUMNS) for id, precip_type in enumerate(precip_types, start=1)]
+    monkeypatch.setattr(training, "get_weatherData_extent", lambda: (len(rows), len(rows)))
+    monkeypatch.setattr(training, "get_weatherData_chunks", lambda columns, chunk_size, max_id=None, after_id=None: iter([rows]))
+
+    X_train, y_train, X_test, y_test, info = training.loadTrainingData(len(rows), test_size=0.0)
+
+    assert y_train.tolist() == [0, 0, 0, 1, 2]
+    assert info['rows_skipped'] == 1
+    assert len(X_test) == 0
+    assert X_train.dtype == np.float32